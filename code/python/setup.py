@@ -38,6 +38,7 @@ setup(
         "transformers==4.24.0",
         "gensim==4.2.0",
         "sqlitedict==1.7.0",
+        "PyStemmer==2.2.0.3",
         "annif==0.59.0",
         "fasttext-wheel==0.9.2",
         "omikuji==0.5.0",
@@ -47,6 +48,9 @@ setup(
         "waitress==2.1.2"
     ],
     extras_require={
+        "numba": [
+            "numba==0.56.4",
+        ],
         "dev": [
             "build",
             "setuptools",
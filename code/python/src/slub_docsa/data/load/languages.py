@@ -2,6 +2,7 @@
 
 import os
 import logging
+import functools
 from typing import Mapping, NamedTuple, Optional
 
 from slub_docsa.common.paths import get_resources_dir
@@ -58,6 +59,26 @@ def download_language_data(
         download_file(url, filepath)
 
 
+@functools.lru_cache(maxsize=4)
+def _load_language_codes_from_file(filepath: str) -> LanguageCodeTable:
+    """Parse the language code table file, which is cached such that the file is only parsed once."""
+    by_l3 = {}
+    by_l2 = {}
+    # file might start with a byte order mark, which is removed by utf-8-sig encoding
+    with open(filepath, "rt", encoding="utf-8-sig") as file:
+        for line in file:
+            parts = line.rstrip("\n").split("|")
+            if len(parts) < 5:
+                continue
+            l3_code, _, l2_code, name, _ = parts
+            language_entry = Language(l2=l2_code if l2_code else None, l3=l3_code, name=name)
+            by_l3[l3_code] = language_entry
+            if l2_code:
+                by_l2[l2_code] = language_entry
+
+    return LanguageCodeTable(by_l3=by_l3, by_l2=by_l2)
+
+
 def load_language_codes(
     url: str = LOC_GOV_ISO_639_URL,
     filepath: str = None,
@@ -65,6 +86,9 @@ def load_language_codes(
 ) -> LanguageCodeTable:
     """Load language code table from file downloaded from loc.gov.
 
+    The parsed language code table is cached in memory and shared between calls for the same file path, so it
+    should not be modified.
+
     Parameters
     ----------
     url : str, optional
@@ -86,17 +110,7 @@ def load_language_codes(
     if download:
         download_language_data(url, filepath)
 
-    languages = []
-    with open(filepath, "rt", encoding="utf8") as file:
-        for line in file.readlines():
-            l3_code, _, l2_code, name, _ = line.split("|")
-            l2_code = l2_code if l2_code else None
-            languages.append(Language(l2=l2_code, l3=l3_code, name=name))
-
-    return LanguageCodeTable(
-        by_l3={language.l3: language for language in languages},
-        by_l2={language.l2: language for language in languages if language.l2 is not None}
-    )
+    return _load_language_codes_from_file(os.path.abspath(filepath))
 
 
 def convert_language_code_to_l3(
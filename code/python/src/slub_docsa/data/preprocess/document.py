@@ -2,9 +2,9 @@
 
 # pylint: disable=too-many-arguments, import-outside-toplevel
 
+import hashlib
 import logging
 import os
-import functools
 import time
 
 from typing import Callable, Iterator, List, Optional
@@ -14,7 +14,7 @@ from sqlitedict import SqliteDict
 from slub_docsa.common.document import Document
 from slub_docsa.common.sample import Sample
 from slub_docsa.data.load.nltk import download_nltk
-from slub_docsa.data.store.document import sha1_hash_from_text
+from slub_docsa.data.store.document import sha1_hash_from_text_seeded
 
 logger = logging.getLogger(__name__)
 
@@ -56,17 +56,24 @@ def document_as_concatenated_string(
     str
         The concatenated text of a document as a simple string
     """
-    text = ""
-    if not skip_title and doc.title is not None:
-        text += doc.title
-    if not skip_authors and doc.authors is not None:
-        text += "\n" + ", ".join(doc.authors)
-    if not skip_abstract and doc.abstract is not None:
-        text += "\n" + doc.abstract
-    if not skip_toc and doc.toc is not None:
-        text += "\n" + doc.toc
-    if not skip_fulltext and doc.fulltext is not None:
-        text += "\n" + doc.fulltext
+    text = doc.title if not skip_title and doc.title is not None else ""
+    parts = [text]
+    length = len(text)
+
+    # stop concatenating once max length is reached, such that long fulltexts are not copied only to be truncated
+    for skip, part in (
+        (skip_authors, ", ".join(doc.authors) if doc.authors is not None else None),
+        (skip_abstract, doc.abstract),
+        (skip_toc, doc.toc),
+        (skip_fulltext, doc.fulltext),
+    ):
+        if max_length is not None and length >= max_length:
+            break
+        if not skip and part is not None:
+            parts.extend(("\n", part))
+            length += len(part) + 1
+
+    text = "".join(parts)
     if max_length is not None:
         return text[:max_length]
     return text
@@ -99,7 +106,17 @@ def nltk_snowball_text_stemming_function(
     lang_code: str,
     remove_stopwords: bool = True
 ) -> Callable[[str], str]:
-    """Return a function that applies the nltk snowball stemmer to a text.
+    """Return a function that applies the snowball stemmer to a text.
+
+    Text is tokenized via nltk, and all tokens of a text are stemmed in one call to the compiled snowball stemmer
+    provided by PyStemmer, which is a lot faster than the pure python snowball stemmer of nltk.
+
+    Note that PyStemmer ships a newer release of the snowball algorithms than nltk, such that a few stems differ
+    (e.g. the German word "lehrerinnen" is stemmed to "lehr" instead of "lehrerinn"). Published models that were trained
+    with stems of the nltk stemmer see slightly different stems when they are loaded and used for classification,
+    and should be re-trained. Persisted stemmed texts, see
+    `persisted_nltk_snowball_text_stemming_function`, are stored with a different hash than nltk stems, such that
+    they are never mixed.
 
     Parameters
     ---------
@@ -111,9 +128,9 @@ def nltk_snowball_text_stemming_function(
     Returns
     -------
     Callable[[str], str]
-        a function that applies the nltk snowball stemmer to a text
+        a function that applies the snowball stemmer to a text
     """
-    from nltk.stem import SnowballStemmer
+    import Stemmer
     from nltk.corpus import stopwords
 
     if lang_code not in NLTK_LANGUAGE_CODES_MAP:
@@ -123,19 +140,12 @@ def nltk_snowball_text_stemming_function(
         download_nltk("stopwords")
 
     nltk_language = NLTK_LANGUAGE_CODES_MAP[lang_code]
-    stemmer = SnowballStemmer(nltk_language)
+    stemmer = Stemmer.Stemmer(nltk_language, 1000000)
     tokenize = nltk_word_tokenize_text_function(lang_code)
-    stopword_set = set(stopwords.words(nltk_language))
+    stopword_set = set(stopwords.words(nltk_language)) if remove_stopwords else set()
     last_log_time = time.time()
     text_count = 0
 
-    @functools.lru_cache(maxsize=1000000)
-    def stem_func(word):
-        return stemmer.stem(word)
-
-    def is_stopword(token: str) -> bool:
-        return token in stopword_set
-
     def stem_text(text: str) -> str:
         nonlocal last_log_time
         nonlocal text_count
@@ -143,8 +153,9 @@ def nltk_snowball_text_stemming_function(
             logger.debug("stemming text, so far %d", text_count)
             last_log_time = time.time()
         text_count += 1
-        filtered_tokens = [token for token in tokenize(text) if not remove_stopwords or not is_stopword(token)]
-        return " ".join([stem_func(token) for token in filtered_tokens])
+        # nltk snowball stemmer converts tokens to lowercase before stemming
+        filtered_tokens = [token.lower() for token in tokenize(text) if token not in stopword_set]
+        return " ".join(stemmer.stemWords(filtered_tokens))
 
     return stem_text
 
@@ -173,9 +184,10 @@ def persisted_nltk_snowball_text_stemming_function(
     os.makedirs(os.path.dirname(filepath), exist_ok=True)
     store = SqliteDict(filepath, tablename="stemmed_text", flag="c", autocommit=True)
     stem_function = nltk_snowball_text_stemming_function(lang_code, remove_stopwords)
+    hash_seed = hashlib.sha1(("pystemmer" + lang_code + str(remove_stopwords)).encode())  # nosec
 
     def stem_text(text: str) -> str:
-        text_hash = sha1_hash_from_text(lang_code + str(remove_stopwords) + text)
+        text_hash = sha1_hash_from_text_seeded(hash_seed, text)
 
         # if stemmed text is known, return from cache
         if text_hash in store:
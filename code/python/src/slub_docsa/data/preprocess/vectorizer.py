@@ -6,18 +6,22 @@ import logging
 import os
 import pickle  # nosec
 import gzip
+import hashlib
 import re
+import sqlite3
+import threading
 import time
 
-from typing import Iterable, Iterator, Optional, Any, Sequence, Union, cast
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Optional, Any, Sequence, Tuple, Union, cast
 from itertools import chain, islice
+from typing_extensions import Literal
 
 import torch
 import numpy as np
 import tokenizers
 import gensim
 
-from sqlitedict import SqliteDict
 from sklearn.feature_extraction.text import TfidfVectorizer as NativeScikitTfidfVectorizer
 from torch.nn.modules.module import Module
 from transformers.models.auto.tokenization_auto import AutoTokenizer
@@ -28,8 +32,8 @@ from slub_docsa.common.paths import get_cache_dir
 from slub_docsa.data.load.wikipedia import load_wikipedia_cirrus_texts
 from slub_docsa.data.preprocess.document import nltk_snowball_text_stemming_function
 from slub_docsa.data.preprocess.document import persisted_nltk_snowball_text_stemming_function
-from slub_docsa.data.store.array import bytes_to_numpy_array, numpy_array_to_bytes
-from slub_docsa.data.store.document import sha1_hash_from_text
+from slub_docsa.data.store.array import numpy_vector_to_quantized_bytes, quantized_bytes_to_numpy_matrix
+from slub_docsa.data.store.document import sha1_hash_from_text, sha1_hash_from_text_seeded
 
 logger = logging.getLogger(__name__)
 
@@ -150,7 +154,11 @@ class GensimTfidfVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
 
 
 class ScikitTfidfVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
-    """Vectorizer using Scikit TfidfVectorizer."""
+    """Vectorizer using Scikit TfidfVectorizer.
+
+    Texts are streamed to the scikit vectorizer for both fit and transform, and are not collected in a list first.
+    Callers that need to iterate texts multiple times need to provide them multiple times.
+    """
 
     PERSIST_FILENAME = "tfidf_vectorizer.pickle.gz"
 
@@ -162,25 +170,34 @@ class ScikitTfidfVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
         max_features: int = 10000
             The maximum number of unique tokens to extract from text during fit.
         kwargs: Any
-            additional arguments that are passed to the scikit tfidf vectorizer
+            additional arguments that are passed to the scikit tfidf vectorizer; features are calculated as float32
+            unless a different `dtype` is provided
         """
         self.max_features = max_features
         self.fitted_once = False
         self.size = None
+        kwargs.setdefault("dtype", np.float32)
         self.vectorizer = NativeScikitTfidfVectorizer(max_features=max_features, **kwargs)
 
     def fit(self, texts: Iterator[str]):
         """Apply the scikit tfidf vectorizer."""
-        corpus = list(texts)
-        logger.debug("do scikit tfidf vectorization of %d texts and %d features", len(corpus), self.max_features)
-        self.vectorizer.fit(corpus)
+        logger.debug("do scikit tfidf vectorization with %d features", self.max_features)
+        self.vectorizer.fit(texts)
         logger.debug("done with scikit tfidf vectorization")
         self.fitted_once = True
         # logger.debug("fitted tfidf vectorizer with vocabulary of %s", str(self.vectorizer.get_feature_names()))
 
     def transform(self, texts: Iterator[str]) -> Iterator[np.ndarray]:
-        """Return vectorized texts."""
-        for row in cast(Any, self.vectorizer.transform(list(texts))).toarray():
+        """Return vectorized texts.
+
+        The sparse tfidf matrix is converted to dense vectors one row at a time, such that the full dense matrix is
+        never allocated.
+        """
+        matrix = cast(Any, self.vectorizer.transform(texts)).tocsr()
+        for i in range(matrix.shape[0]):
+            start, end = matrix.indptr[i], matrix.indptr[i + 1]
+            row = np.zeros(matrix.shape[1], dtype=matrix.dtype)
+            row[matrix.indices[start:end]] = matrix.data[start:end]
             if self.size is None:
                 self.size = row.shape[0]
             if not np.any(row):
@@ -301,14 +318,15 @@ class RandomVectorizer(AbstractVectorizer):
             The size of the returned random vectors
         """
         self.size = size
+        self.rng = np.random.default_rng()
 
     def fit(self, texts: Iterator[str]):
         """Fit vectorizer."""
 
     def transform(self, texts: Iterator[str]) -> Iterator[np.ndarray]:
-        """Return vectorized texts."""
-        for row in np.random.random((len(list(texts)), self.size)):
-            yield row
+        """Return a random float32 vector for each text, iterating texts only once."""
+        for _ in texts:
+            yield self.rng.random(self.size, dtype=np.float32)
 
     def output_shape(self):
         """Return the requested size of random features vectors as tuple (size,)."""
@@ -397,9 +415,25 @@ class CachedVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
 
 
 class PersistedCachedVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
-    """Stores vectorizations in persistent cache."""
+    """Stores vectorizations in persistent cache.
+
+    Vectors are stored as raw buffers of fixed size, such that all vectors of a batch can be unpacked at once.
+    """
 
-    def __init__(self, filepath: str, vectorizer: AbstractVectorizer, batch_size: int = 100):
+    TABLE_NAMES = {
+        "fp32": "vectorization_float32_arrays",
+        "fp16": "vectorization_float16_arrays",
+        "int8": "vectorization_int8_arrays",
+    }
+    MAX_QUERY_PARAMETERS = 500
+
+    def __init__(
+        self,
+        filepath: str,
+        vectorizer: AbstractVectorizer,
+        batch_size: int = 100,
+        quantization: Literal["fp32", "fp16", "int8"] = "fp32",
+    ):
         """Initialize vectorizer.
 
         Parameters
@@ -410,19 +444,70 @@ class PersistedCachedVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
             The parent vectorizer used to vectorize texts in case texts can not be found in cache.
         batch_size: int
             The number of text to process in one batch
+        quantization: Literal["fp32", "fp16", "int8"] = "fp32"
+            The precision of stored vectors; "fp16" halves the cache size, "int8" stores each vector as a float32
+            scale followed by int8 values. Vectors are always returned as float32. Each quantization is stored in a
+            separate table.
         """
+        if quantization not in self.TABLE_NAMES:
+            raise ValueError(f"unknown quantization '{quantization}'")
         self.filepath = filepath
         self.batch_size = batch_size
-        self.store = SqliteDict(filepath, tablename="vectorizations", flag="c", autocommit=False)
+        self.quantization = quantization
+        self.table_name = self.TABLE_NAMES[quantization]
+        # the connection is shared between threads, which is why all queries and transactions are serialized
+        self.connection = sqlite3.connect(filepath, check_same_thread=False)
+        self.connection_lock = threading.Lock()
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("PRAGMA temp_store=MEMORY")
+        self.connection.execute(
+            f"CREATE TABLE IF NOT EXISTS \"{self.table_name}\" (hash TEXT PRIMARY KEY, vec BLOB)"
+        )
         self.vectorizer = vectorizer
 
+    def _load_cached_vectorizations(self, text_hashes: Sequence[str]) -> Dict[str, bytes]:
+        """Return serialized vectorizations for all text hashes that are found in the cache."""
+        unique_hashes = list(set(text_hashes))
+        cached = {}
+        for i in range(0, len(unique_hashes), self.MAX_QUERY_PARAMETERS):
+            hashes_part = unique_hashes[i:i + self.MAX_QUERY_PARAMETERS]
+            placeholders = ",".join("?" * len(hashes_part))
+            with self.connection_lock:
+                cached.update(self.connection.execute(
+                    f"SELECT hash, vec FROM \"{self.table_name}\" WHERE hash IN ({placeholders})",  # nosec
+                    hashes_part
+                ).fetchall())
+        return cached
+
+    def _store_vectorizations(self, rows: Sequence[Any]):
+        """Store serialized vectorizations as rows of (hash, bytes) in a single transaction.
+
+        The transaction is rolled back if any row can not be stored.
+        """
+        with self.connection_lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR REPLACE INTO \"{self.table_name}\" VALUES (?, ?)", rows  # nosec
+            )
+
+    def close(self):
+        """Close the connection to the database of persisted vectorizations."""
+        with self.connection_lock:
+            self.connection.close()
+
+    def __del__(self):
+        """Close the database connection when the vectorizer is garbage collected."""
+        connection = getattr(self, "connection", None)
+        if connection is not None:
+            connection.close()
+
     def fit(self, texts: Iterator[str]):
         """Fit parent vectorizer."""
         self.vectorizer.fit(texts)
 
     def transform(self, texts: Iterator[str]) -> Iterator[np.ndarray]:
         """Return vectorized texts from cache or by calling parent vectorizer."""
-        vectorizer_str = str(self.vectorizer)
+        vectorizer_seed = hashlib.sha1(str(self.vectorizer).encode())  # nosec
         total = 0
         last_log_time = time.time()
 
@@ -433,18 +518,20 @@ class PersistedCachedVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
                 break
 
             # check which texts needs vectorizing
-            texts_chunk_hashes = [sha1_hash_from_text(vectorizer_str + t) for t in texts_chunk]
-            uncached_texts = [t for i, t in enumerate(texts_chunk) if texts_chunk_hashes[i] not in self.store]
+            texts_chunk_hashes = [sha1_hash_from_text_seeded(vectorizer_seed, t) for t in texts_chunk]
+            cached = self._load_cached_vectorizations(texts_chunk_hashes)
+            uncached_texts = {h: t for h, t in zip(texts_chunk_hashes, texts_chunk) if h not in cached}
 
             # do vectorization for not yet known texts
             if len(uncached_texts) > 0:
-                for i, uncached_features in enumerate(self.vectorizer.transform(iter(uncached_texts))):
-                    uncached_hash = sha1_hash_from_text(vectorizer_str + uncached_texts[i])
-                    self.store[uncached_hash] = numpy_array_to_bytes(uncached_features)
-                self.store.commit()
+                uncached_features_iterator = self.vectorizer.transform(iter(uncached_texts.values()))
+                for uncached_hash, uncached_features in zip(uncached_texts, uncached_features_iterator):
+                    cached[uncached_hash] = numpy_vector_to_quantized_bytes(uncached_features, self.quantization)
+                self._store_vectorizations([(h, cached[h]) for h in uncached_texts])
 
-            for text_hash in texts_chunk_hashes:
-                yield bytes_to_numpy_array(self.store[text_hash])
+            yield from quantized_bytes_to_numpy_matrix(
+                b"".join(cached[h] for h in texts_chunk_hashes), len(texts_chunk), self.quantization
+            )
 
             total += len(texts_chunk)
             if time.time() - last_log_time > 5.0:
@@ -471,7 +558,8 @@ class PersistedCachedVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
 
     def __str__(self):
         """Return representative string of vectorizer."""
-        return f"<PersistentCachedVectorizer of={str(self.vectorizer)} at={self.filepath}>"
+        return f"<PersistentCachedVectorizer of={str(self.vectorizer)} at={self.filepath} " + \
+            f"quantization={self.quantization}>"
 
 
 def _extract_subtext_samples(text: str, samples: int) -> Iterator[str]:
@@ -483,11 +571,8 @@ def _extract_subtext_samples(text: str, samples: int) -> Iterator[str]:
     for i in range(samples):
         start_idx = int(i * offset)
 
-        # move to beginning of a word
-        while start_idx > 0 and text[start_idx] != " ":
-            start_idx -= 1
-        if text[start_idx] == " ":
-            start_idx += 1
+        # move to beginning of a word, which starts after the last space at or before the starting position
+        start_idx = text.rfind(" ", 0, start_idx + 1) + 1
 
         sub_text = text[start_idx:]
         # logger.debug("subtext is %s", sub_text[:100].strip())
@@ -514,6 +599,8 @@ class HuggingfaceBertVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
         subtext_samples: int = 1,
         hidden_states: int = 1,
         cache_dir: Optional[str] = None,
+        tokenizer_cache_size: int = 10000,
+        mixed_precision: bool = False,
     ):
         """Initialize vectorizer.
 
@@ -530,6 +617,14 @@ class HuggingfaceBertVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
             Multiple hidden state vectors are simply concatenated.
         cache_dir: str
             The directory storing pre-trained Huggingface models
+        tokenizer_cache_size: int = 10000
+            The maximum number of subtext encodings that are kept in memory such that repeatedly vectorized texts
+            do not need to be tokenized again; 0 disables caching
+        mixed_precision: bool = False
+            Whether to evaluate the Bert model with bfloat16 (or float16 if bfloat16 is not supported) mixed
+            precision when running on a GPU; vectorizations are always returned as float32, but differ slightly from
+            vectorizations calculated with full precision, which is why mixed precision is part of the string
+            representation (used e.g. as cache key)
         """
         self.model_identifier = model_identifier
         self.batch_size = batch_size
@@ -539,6 +634,12 @@ class HuggingfaceBertVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.tokenizer: Optional[Module] = None
         self.model: Optional[Module] = None
+        self.tokenizer_cache_size = tokenizer_cache_size
+        self.tokenizer_cache: OrderedDict = OrderedDict()
+        self.mixed_precision = mixed_precision and self.device == "cuda"
+        self.autocast_dtype = None
+        if self.mixed_precision:
+            self.autocast_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
 
         if self.cache_dir is None:
             self.cache_dir = os.path.join(get_cache_dir(), "huggingface")
@@ -565,40 +666,108 @@ class HuggingfaceBertVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
                 self.model = cast(Module, BertModel.from_pretrained(self.model_identifier, cache_dir=self.cache_dir))
             self.model.to(self.device)
 
+    def _tokenize(self, subtexts: Sequence[str]) -> BatchEncoding:
+        """Return batch encodings for subtexts, re-using cached encodings of previously tokenized subtexts."""
+        if self.tokenizer is None:
+            raise ValueError("cannot tokenize texts when tokenizer did not load correctly")
+
+        subtext_hashes = [sha1_hash_from_text(t) for t in subtexts]
+        uncached = {h: t for h, t in zip(subtext_hashes, subtexts) if h not in self.tokenizer_cache}
+
+        new_encodings = {}
+        if uncached:
+            encodings = self.tokenizer(
+                list(uncached.values()),
+                padding=True,
+                truncation=True,
+                return_tensors="pt"
+            )
+            lengths = encodings["attention_mask"].sum(dim=1).tolist()
+            for i, subtext_hash in enumerate(uncached):
+                new_encodings[subtext_hash] = {
+                    key: value[i, :lengths[i]].clone() for key, value in encodings.items()
+                }
+
+        batch = []
+        for subtext_hash in subtext_hashes:
+            if subtext_hash in new_encodings:
+                encoding = new_encodings[subtext_hash]
+                self.tokenizer_cache[subtext_hash] = encoding
+            else:
+                encoding = self.tokenizer_cache[subtext_hash]
+            self.tokenizer_cache.move_to_end(subtext_hash)
+            batch.append(encoding)
+
+        # evict least recently used encodings
+        while len(self.tokenizer_cache) > self.tokenizer_cache_size:
+            self.tokenizer_cache.popitem(last=False)
+
+        return self._pad_batch(batch)
+
+    def _pad_batch(self, batch: Sequence[Dict[str, torch.Tensor]]) -> BatchEncoding:
+        """Pad unpadded encodings to the longest encoding in the batch instead of the maximum model length."""
+        max_length = max(max(len(encoding["input_ids"]) for encoding in batch), self.hidden_states)
+        padded = {}
+        for key in batch[0]:
+            padding_value = self.tokenizer.pad_token_id if key == "input_ids" else 0
+            padded[key] = torch.full((len(batch), max_length), padding_value, dtype=batch[0][key].dtype)
+            for i, encoding in enumerate(batch):
+                padded[key][i, :len(encoding[key])] = encoding[key]
+        return BatchEncoding(padded)
+
     def fit(self, texts: Iterator[str]):
         """Not required for pre-trained Huggingface models."""
 
+    def _prepare_chunk(self, texts: Iterator[str]) -> Optional[Tuple[int, BatchEncoding, Optional[np.ndarray]]]:
+        """Tokenize the next chunk of texts and start copying its encodings to the device.
+
+        Returns a tuple of the number of texts in the chunk, the encodings of all unique subtexts, and the index of the
+        unique subtext for every subtext in case there are duplicates, or None if there are no more texts.
+        """
+        texts_chunk = list(islice(texts, self.batch_size))
+
+        if not texts_chunk:
+            return None
+
+        # extract subtexts and remeber which subtext belongs to which text
+        subtext_texts = [t for text in texts_chunk for t in _extract_subtext_samples(text, self.subtext_samples)]
+
+        # evaluate duplicate subtexts only once
+        unique_subtexts: Dict[str, int] = {}
+        unique_indexes = np.array([unique_subtexts.setdefault(t, len(unique_subtexts)) for t in subtext_texts])
+        if len(unique_subtexts) == len(subtext_texts):
+            unique_indexes = None
+
+        # tokenize texts
+        encodings = self._tokenize(list(unique_subtexts))
+
+        # copy encodings asynchronously via pinned memory
+        if self.device == "cuda":
+            encodings = BatchEncoding({
+                key: value.pin_memory().to(self.device, non_blocking=True) for key, value in encodings.items()
+            })
+        return len(texts_chunk), encodings, unique_indexes
+
     def transform(self, texts: Iterator[str]) -> Iterator[np.ndarray]:
-        """Return vectorized texts as a matrix with shape (len(texts), 768)."""
+        """Return vectorized texts as a matrix with shape (len(texts), 768).
+
+        While the model is evaluated for a chunk of texts, the next chunk of texts is already tokenized.
+        """
         # lazy load model only when it is actually needed
         self._load_model()
 
         if self.tokenizer is None or self.model is None:
             raise ValueError("cannot transform texts when tokenizer or model did not load correctly")
 
-        features_chunks = []
         i = 0
         # total = len(texts)
         total_so_far = 0
         last_log = time.time()
+        hidden_states_list = list(range(self.hidden_states))
 
-        while True:
-            texts_chunk = list(islice(texts, self.batch_size))
-
-            if not texts_chunk:
-                break
-
-            # extract subtexts and remeber which subtext belongs to which text
-            subtext_texts = [t for text in texts_chunk for t in _extract_subtext_samples(text, self.subtext_samples)]
-
-            # tokenize texts
-            encodings = self.tokenizer(
-                subtext_texts,
-                padding="max_length",
-                truncation=True,
-                return_tensors="pt"
-            )
-            encodings.to(self.device)
+        next_chunk = self._prepare_chunk(texts)
+        while next_chunk is not None:
+            number_of_texts, encodings, unique_indexes = next_chunk
 
             if time.time() - last_log > 5:
                 logger.info(
@@ -607,22 +776,28 @@ class HuggingfaceBertVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
                 )
                 last_log = time.time()
 
-            # evaluate model
-            with torch.no_grad():
+            # evaluate model, which runs asynchronously on a gpu
+            with torch.inference_mode(), torch.autocast(
+                device_type=self.device, dtype=self.autocast_dtype, enabled=self.mixed_precision
+            ):
                 output = self.model(**encodings)
+                hidden_states = output.last_hidden_state[:, hidden_states_list, :].float()
+
+            # tokenize next chunk while model is evaluated
+            next_chunk = self._prepare_chunk(texts)
 
             # remember model outputs
-            hidden_states_list = list(range(self.hidden_states))
-            features_chunk = output.last_hidden_state[:, hidden_states_list, :].cpu().detach().numpy()
+            features_chunk = hidden_states.cpu().numpy().astype(np.float32, copy=False)
+            if unique_indexes is not None:
+                features_chunk = features_chunk[unique_indexes]
 
-            features_chunk = features_chunk.reshape((len(texts_chunk), -1))
+            features_chunk = features_chunk.reshape((number_of_texts, -1))
             # logger.info("features chunk shape is %s", features_chunk.shape)
-            features_chunks.append(features_chunk)
 
             for features in features_chunk:
                 yield cast(np.ndarray, features)
 
-            total_so_far += len(texts_chunk)
+            total_so_far += number_of_texts
             i += 1
 
     def output_shape(self):
@@ -640,7 +815,8 @@ class HuggingfaceBertVectorizer(PersistableVectorizerMixin, AbstractVectorizer):
     def __str__(self):
         """Return representative string of vectorizer."""
         return f"<HFaceBertVectorizer model=\"{self.model_identifier}\" batch_size={self.batch_size} " \
-            + f"subtext_samples={self.subtext_samples} hidden_states={self.hidden_states}>"
+            + f"subtext_samples={self.subtext_samples} hidden_states={self.hidden_states}" \
+            + (f" mixed_precision={self.autocast_dtype}" if self.mixed_precision else "") + ">"
 
 
 class AbstractSequenceVectorizer(AbstractVectorizer):
@@ -1,7 +1,11 @@
 """Helper methods to store numpy arrays."""
 
 import io
-from typing import cast
+import tempfile
+
+from itertools import chain
+from typing import Iterable, Optional, cast
+from typing_extensions import Literal
 
 import numpy as np
 
@@ -41,3 +45,116 @@ def bytes_to_numpy_array(data: bytes) -> np.ndarray:
     buffer = io.BytesIO(data)
     buffer.seek(0)
     return cast(np.ndarray, np.load(buffer))
+
+
+def numpy_vector_to_quantized_bytes(vector: np.ndarray, quantization: Literal["fp32", "fp16", "int8"]) -> bytes:
+    """Convert a vector to the raw buffer of its values in the given precision.
+
+    Parameters
+    ----------
+    vector: numpy.ndarray
+        the vector that is converted to bytes
+    quantization: Literal["fp32", "fp16", "int8"]
+        the precision of the stored values; "int8" stores a float32 scale followed by the int8 values
+
+    Returns
+    -------
+    bytes
+        the raw buffer of the quantized vector, which has the same size for vectors of the same length
+    """
+    vector = np.asarray(vector, dtype=np.float32)
+    if quantization == "fp16":
+        return vector.astype(np.float16).tobytes()
+    if quantization == "int8":
+        max_value = float(np.max(np.abs(vector), initial=0.0))
+        scale = np.float32(max_value / 127.0 if max_value > 0 else 1.0)
+        return scale.tobytes() + np.round(vector / scale).astype(np.int8).tobytes()
+    return vector.tobytes()
+
+
+def quantized_bytes_to_numpy_matrix(
+    data: bytes,
+    number_of_vectors: int,
+    quantization: Literal["fp32", "fp16", "int8"],
+) -> np.ndarray:
+    """Unpack the concatenated raw buffers of multiple quantized vectors at once into a float32 matrix.
+
+    Parameters
+    ----------
+    data: bytes
+        the concatenated buffers as returned by `numpy_vector_to_quantized_bytes` for vectors of the same length
+    number_of_vectors: int
+        the number of concatenated vectors
+    quantization: Literal["fp32", "fp16", "int8"]
+        the precision the vectors were stored with
+
+    Returns
+    -------
+    numpy.ndarray
+        the float32 matrix of shape `(number_of_vectors, vector_length)`
+    """
+    if quantization == "fp16":
+        return np.frombuffer(data, dtype=np.float16).reshape((number_of_vectors, -1)).astype(np.float32)
+    if quantization == "int8":
+        rows = np.frombuffer(data, dtype=np.uint8).reshape((number_of_vectors, -1))
+        scales = rows[:, :4].copy().view(np.float32)
+        return rows[:, 4:].view(np.int8).astype(np.float32) * scales
+    return np.frombuffer(data, dtype=np.float32).reshape((number_of_vectors, -1)).copy()
+
+
+def vectors_as_matrix(
+    vectors: Iterable[np.ndarray],
+    number_of_vectors: int,
+    dtype: Optional[np.dtype] = None,
+    memmap_directory: Optional[str] = None,
+) -> np.ndarray:
+    """Collect vectors in a matrix that is pre-allocated based on the shape of the first vector.
+
+    In contrast to `np.array(list(vectors))`, no intermediate list of arrays needs to be kept in memory and copied.
+
+    Parameters
+    ----------
+    vectors: Iterable[np.ndarray]
+        the vectors, e.g., as returned by the `transform` method of a vectorizer
+    number_of_vectors: int
+        the number of vectors provided by the iterable
+    dtype: Optional[np.dtype] = None
+        the dtype of the matrix, by default the dtype of the first vector
+    memmap_directory: Optional[str] = None
+        if given, the matrix is stored in an anonymous temporary file in this directory and memory-mapped, such that
+        it does not need to fit into memory
+
+    Returns
+    -------
+    np.ndarray
+        the matrix of shape `(number_of_vectors, *vector_shape)` containing all vectors
+
+    Raises
+    ------
+    ValueError
+        if the iterable does not provide exactly `number_of_vectors` vectors
+    """
+    vectors_iterator = iter(vectors)
+    first_vector = next(vectors_iterator, None)
+    if first_vector is None:
+        if number_of_vectors > 0:
+            raise ValueError(f"expected {number_of_vectors} vectors, but got none")
+        return np.empty((0,), dtype=dtype)
+
+    shape = (number_of_vectors,) + first_vector.shape
+    dtype = first_vector.dtype if dtype is None else dtype
+    if memmap_directory is not None:
+        # the file is deleted as soon as it is closed, but remains accessible via the memory map
+        with tempfile.TemporaryFile(dir=memmap_directory) as file:
+            matrix = np.memmap(file, dtype=dtype, mode="w+", shape=shape)
+    else:
+        matrix = np.empty(shape, dtype=dtype)
+
+    count = 0
+    for count, row in enumerate(chain([first_vector], vectors_iterator), start=1):
+        if count > number_of_vectors:
+            raise ValueError(f"expected {number_of_vectors} vectors, but got more")
+        matrix[count - 1] = row
+    if count != number_of_vectors:
+        raise ValueError(f"expected {number_of_vectors} vectors, but got {count}")
+    return matrix
@@ -17,3 +17,26 @@ def sha1_hash_from_text(text: str) -> str:
         the hash of the text
     """
     return hashlib.sha1(text.encode()).hexdigest()  # nosec
+
+
+def sha1_hash_from_text_seeded(seed: "hashlib._Hash", text: str) -> str:
+    """Return sha1 hex digest as string for text that is appended to the data already hashed by a seed.
+
+    The result is the same as `sha1_hash_from_text(prefix + text)` for a seed `hashlib.sha1(prefix.encode())`, but
+    avoids concatenating and encoding the prefix for every text.
+
+    Parameters
+    ----------
+    seed: hashlib._Hash
+        A sha1 hash object that was already updated with a common prefix; it is not modified
+    text: str
+        The text to be hashed
+
+    Returns
+    -------
+    str
+        the hash of the prefix and text
+    """
+    text_hash = seed.copy()
+    text_hash.update(text.encode())
+    return text_hash.hexdigest()
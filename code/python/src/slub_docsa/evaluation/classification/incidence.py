@@ -1,7 +1,7 @@
 """Methods to work with incidence matrices."""
 
 import logging
-from typing import Iterator, List, Sequence
+from typing import Iterator, List, Mapping, Optional, Sequence, Tuple
 
 import numpy as np
 from slub_docsa.common.score import IncidenceDecisionFunction
@@ -42,7 +42,8 @@ def unique_subject_order(targets: Sequence[SubjectUriList]) -> Sequence[str]:
 
 def subject_incidence_matrix_from_targets(
     targets: Sequence[SubjectUriList],
-    subject_order: Sequence[str]
+    subject_order: Sequence[str],
+    subject_order_map: Optional[Mapping[str, int]] = None,
 ) -> np.ndarray:
     """Return an incidence matrix for the list of subject annotations in `targets`.
 
@@ -52,6 +53,9 @@ def subject_incidence_matrix_from_targets(
         an ordered list of subjects lists, each representing the subjects that associated with a document
     subject_order: Sequence[str]
         an ordered list of subjects without duplicates, e.g., generated via `unique_subject_order`
+    subject_order_map: Optional[Mapping[str, int]] = None
+        optional pre-computed map from subject uri to its position in the subject order, which avoids building the
+        map again when calculating incidence matrices for many batches of targets
 
     Returns
     -------
@@ -60,14 +64,21 @@ def subject_incidence_matrix_from_targets(
         by which subject. The column order corresponds to the order of subjects found in `subject_order`.
         The order of row corresponds to the order of `targets`.
     """
-    incidence_matrix = np.zeros((len(targets), len(subject_order)), dtype=np.uint8)
-    subject_order_map = {s_uri: i for i, s_uri in enumerate(subject_order)}
+    if subject_order_map is None:
+        subject_order_map = {s_uri: i for i, s_uri in enumerate(subject_order)}
+
+    rows = []
+    columns = []
     for i, uri_list in enumerate(targets):
         for uri in uri_list:
             if uri in subject_order_map:
-                incidence_matrix[i, subject_order_map[uri]] = 1
+                rows.append(i)
+                columns.append(subject_order_map[uri])
             else:
                 logger.warning("subject '%s' not given in subject_order list (maybe only in test data)", uri)
+
+    incidence_matrix = np.zeros((len(targets), len(subject_order)), dtype=np.uint8)
+    incidence_matrix[rows, columns] = 1
     return incidence_matrix
 
 
@@ -145,21 +156,27 @@ class ThresholdIncidenceDecision(IncidenceDecisionFunction):
         """
         self.threshold = threshold
 
-    def __call__(self, probabilities: np.ndarray) -> np.ndarray:
+    def __call__(self, probabilities: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
         """Transform a numpy array of subject probabilities to an incidence matrix by applying a thresold.
 
         Parameters
         ----------
         probabilities : np.ndarray
             the matrix containg probability scores between 0 and 1
+        out : Optional[np.ndarray], optional
+            an optional uint8 or bool matrix of the same shape as the probabilities matrix that is used to store the
+            incidences instead of allocating a new matrix
 
         Returns
         -------
         np.ndarray
             the incidence matrix containing incidences (either 0 or 1)
         """
+        if out is not None:
+            return np.greater_equal(probabilities, self.threshold, out=out)
         # slower: return np.array(np.where(probabilities >= threshold, 1, 0))
-        return (probabilities >= self.threshold).astype(np.uint8)
+        # re-interpret boolean matrix as uint8 without copying it
+        return (probabilities >= self.threshold).view(np.uint8)
 
     def __str__(self):
         """Return a string representation of this incidence decision function, which is used for caching."""
@@ -246,7 +263,7 @@ class PositiveTopkIncidenceDecision(IncidenceDecisionFunction):
         np.ndarray
             the incidence matrix containing incidences (either 0 or 1)
         """
-        incidence = np.zeros(probabilities.shape)
+        incidence = np.zeros(probabilities.shape, dtype=np.uint8)
         x_indices = np.repeat(np.arange(0, incidence.shape[0]), self.k)
         y_indices = np.argpartition(probabilities, -self.k)[:, -self.k:].flatten()
         incidence[x_indices, y_indices] = 1
@@ -258,10 +275,59 @@ class PositiveTopkIncidenceDecision(IncidenceDecisionFunction):
         return f"<PositiveTopkIncidenceDecision k={self.k}>"
 
 
+class CachedIncidenceDecision(IncidenceDecisionFunction):
+    """Incidence decision function that remembers the incidence matrices of the most recent probability matrices.
+
+    Allows multiple score functions to share the same incidence decision, such that it is applied only once for
+    each batch of true and predicted probabilities. Probability matrices are recognized by identity, which means they
+    must not be modified in place after they have been passed to this decision function.
+    """
+
+    def __init__(self, incidence_decision: IncidenceDecisionFunction, cache_size: int = 2):
+        """Wrap an incidence decision function.
+
+        Parameters
+        ----------
+        incidence_decision : IncidenceDecisionFunction
+            the incidence decision function whose results are remembered
+        cache_size : int, optional
+            the number of most recent probability matrices whose incidence matrices are remembered, by default 2
+            (the true and predicted probabilities of a batch)
+        """
+        self.incidence_decision = incidence_decision
+        self.cache_size = cache_size
+        self._cache: List[Tuple[np.ndarray, np.ndarray]] = []
+
+    def __call__(self, probabilities: np.ndarray) -> np.ndarray:
+        """Return the remembered incidence matrix, or apply the wrapped incidence decision.
+
+        Parameters
+        ----------
+        probabilities : np.ndarray
+            the matrix containg probability scores between 0 and 1
+
+        Returns
+        -------
+        np.ndarray
+            the incidence matrix containing incidences (either 0 or 1), which must not be modified
+        """
+        for cached_probabilities, cached_incidence in self._cache:
+            if cached_probabilities is probabilities:
+                return cached_incidence
+        incidence = self.incidence_decision(probabilities)
+        self._cache = (self._cache + [(probabilities, incidence)])[-self.cache_size:]
+        return incidence
+
+    def __str__(self):
+        """Return the string representation of the wrapped incidence decision function, which is used for caching."""
+        return str(self.incidence_decision)
+
+
 def extend_incidence_list_to_ancestors(
     subject_hierarchy: SubjectHierarchy,
     subject_order: Sequence[str],
     incidence_list: Sequence[int],
+    subject_order_map: Optional[Mapping[str, int]] = None,
 ) -> Sequence[int]:
     """Return an extended incidence list that marks all ancestors subjects.
 
@@ -275,6 +341,9 @@ def extend_incidence_list_to_ancestors(
         the subject order that is used to infer which subject is references by which position in the incidence list
     incidence_list: Sequence[int]
         the incidence list that is extended with incidences for all ancestor subjects
+    subject_order_map: Optional[Mapping[str, int]] = None
+        optional pre-computed map from subject uri to its position in the subject order, which avoids searching the
+        subject order for every ancestor when extending many incidence lists
 
     Returns
     -------
@@ -282,6 +351,9 @@ def extend_incidence_list_to_ancestors(
         a new incidence list that is extended (meaning there are additional 1 entries) for all ancestors of the
         subjects previously marked in the incidence list
     """
+    if subject_order_map is None:
+        subject_order_map = {s_uri: i for i, s_uri in enumerate(subject_order)}
+
     extended_incidence: List[int] = list(incidence_list)
     for i, value in enumerate(incidence_list):
         if value == 1:
@@ -289,8 +361,8 @@ def extend_incidence_list_to_ancestors(
             subject_uri = subject_order[i]
             ancestors = subject_ancestors_list(subject_uri, subject_hierarchy)
             for ancestor in ancestors:
-                if ancestor in subject_order:
-                    ancestor_id = subject_order.index(ancestor)
+                ancestor_id = subject_order_map.get(ancestor)
+                if ancestor_id is not None:
                     extended_incidence[ancestor_id] = 1
     return extended_incidence
 
@@ -5,8 +5,9 @@
 import logging
 import time
 
+from concurrent.futures import ThreadPoolExecutor
 from itertools import islice
-from typing import Callable, Iterator, Optional, Sequence, Tuple
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 
@@ -16,7 +17,9 @@ from slub_docsa.common.score import BatchedPerClassProbabilitiesScore, BatchedMu
 from slub_docsa.evaluation.dataset.condition import check_dataset_subject_distribution
 from slub_docsa.evaluation.dataset.condition import check_dataset_subjects_have_minimum_samples
 from slub_docsa.evaluation.classification.incidence import subject_incidence_matrix_from_targets
-from slub_docsa.evaluation.classification.incidence import LazySubjectIncidenceTargets
+from slub_docsa.evaluation.classification.incidence import LazySubjectIncidenceTargets, CachedIncidenceDecision
+from slub_docsa.evaluation.classification.score.batched import BatchedIncidenceDecisionScore
+from slub_docsa.evaluation.classification.score.batched import BatchedIncidenceDecisionPerClassScore
 from slub_docsa.evaluation.classification.split import DatasetSplitFunction
 from slub_docsa.models.classification.dummy import OracleModel
 
@@ -67,6 +70,7 @@ def default_batch_predict_model(
     subject_order: Sequence[str],
     test_dataset: Dataset,
     batch_size: int = 100,
+    float32_probabilities: bool = True,
 ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
     """Predict test data for a model in batches, meaning the default prediciton strategy.
 
@@ -80,6 +84,9 @@ def default_batch_predict_model(
         the test dataset that is supposed to be predicted
     batch_size : int, optional
         the batch size, by default 100
+    float32_probabilities : bool, optional
+        whether to convert predicted probabilities to float32 before scoring, which halves the memory that is read
+        when comparing probabilities to thresholds, by default True
 
     Yields
     ------
@@ -88,6 +95,8 @@ def default_batch_predict_model(
     """
     test_document_generator = iter(test_dataset.documents)
     test_subjects_generator = iter(test_dataset.subjects)
+    subject_order_map = {s_uri: i for i, s_uri in enumerate(subject_order)}
+    is_oracle_model = isinstance(model, OracleModel)
 
     last_log_time = time.time()
 
@@ -107,15 +116,19 @@ def default_batch_predict_model(
             break
 
         incidence_start = time.time()
-        test_incidence_chunk = subject_incidence_matrix_from_targets(test_subjects_chunk, subject_order)
+        test_incidence_chunk = subject_incidence_matrix_from_targets(
+            test_subjects_chunk, subject_order, subject_order_map
+        )
         logger.debug("incidence for chunk %d took %d ms", chunk_count, (time.time() - incidence_start) * 1000)
 
-        if isinstance(model, OracleModel):
+        if is_oracle_model:
             # provide predictions to oracle model
             model.set_test_targets(test_incidence_chunk)
 
         prediction_start = time.time()
         predicted_probabilities_chunk = model.predict_proba(test_document_chunk)
+        if float32_probabilities and predicted_probabilities_chunk.dtype == np.float64:
+            predicted_probabilities_chunk = predicted_probabilities_chunk.astype(np.float32)
         logger.debug("prediction of chunk %d took %d ms", chunk_count, (time.time() - prediction_start) * 1000)
 
         chunk_count += 1
@@ -124,6 +137,27 @@ def default_batch_predict_model(
         yield test_incidence_chunk, predicted_probabilities_chunk
 
 
+def _share_incidence_decisions(
+    batched_scores: Sequence[Union[BatchedMultiClassProbabilitiesScore, BatchedPerClassProbabilitiesScore]],
+):
+    """Let scores with equal incidence decisions share a single cached decision.
+
+    Incidence decisions are considered equal if their string representations (as used for caching) are equal. The
+    shared decision is applied only once for each batch instead of once per score.
+    """
+    scores_by_decision: Dict[str, List[Union[BatchedIncidenceDecisionScore, BatchedIncidenceDecisionPerClassScore]]] \
+        = {}
+    for batched_score in batched_scores:
+        if isinstance(batched_score, (BatchedIncidenceDecisionScore, BatchedIncidenceDecisionPerClassScore)):
+            scores_by_decision.setdefault(str(batched_score.incidence_decision), []).append(batched_score)
+
+    for scores in scores_by_decision.values():
+        if len(scores) > 1:
+            shared_decision = CachedIncidenceDecision(scores[0].incidence_decision)
+            for batched_score in scores:
+                batched_score.incidence_decision = shared_decision
+
+
 def default_batch_evaluate_model(
     model: ClassificationModel,
     subject_order: Sequence[str],
@@ -131,6 +165,7 @@ def default_batch_evaluate_model(
     score_generators: Sequence[Callable[[], BatchedMultiClassProbabilitiesScore]],
     per_class_score_generators: Sequence[Callable[[], BatchedPerClassProbabilitiesScore]],
     batch_size: int = 100,
+    float32_probabilities: bool = True,
 ) -> Tuple[SingleModelScores, SingleModelPerClassScores]:
     """Evaluate a model given a test dataset and various score functions in batches.
 
@@ -148,6 +183,8 @@ def default_batch_evaluate_model(
         generators for batched score functions that measure the classification performance for each subject
     batch_size : int, optional
         the batch size, by default 100
+    float32_probabilities : bool, optional
+        whether to convert predicted probabilities to float32 before scoring, by default True
 
     Returns
     -------
@@ -158,9 +195,12 @@ def default_batch_evaluate_model(
     # initialize new batched scoring functions
     batched_scores = [generator() for generator in score_generators]
     batched_per_class_scores = [generator() for generator in per_class_score_generators]
+    _share_incidence_decisions(list(batched_scores) + list(batched_per_class_scores))
 
     chunk_count = 0
-    test_chunk_generator = default_batch_predict_model(model, subject_order, test_dataset, batch_size)
+    test_chunk_generator = default_batch_predict_model(
+        model, subject_order, test_dataset, batch_size, float32_probabilities
+    )
     for test_incidence_chunk, predicted_probabilities_chunk in test_chunk_generator:
         scoring_start = time.time()
         for batched_score in batched_scores:
@@ -294,6 +334,7 @@ def score_classification_models_for_dataset_with_splits(
     batch_size: int = 100,
     check_minimum_samples: bool = True,
     check_split_distribution: bool = True,
+    n_jobs: int = 1,
 ) -> Tuple[MultiSplitScores, MultiSplitPerClassScores]:
     """Evaluate a dataset using cross-validation for a number of models and score functions.
 
@@ -328,6 +369,9 @@ def score_classification_models_for_dataset_with_splits(
         training and evaluation strategy
     check_minimum_samples: bool, optional
         check whether the dataset has sufficient samples for each subject to do a x-fold cross-validation
+    n_jobs : int, optional
+        the number of models that are trained and evaluated concurrently for each split, by default 1; see
+        `score_classification_models_for_dataset` for restrictions on models that are evaluated concurrently
 
     Returns
     -------
@@ -375,6 +419,7 @@ def score_classification_models_for_dataset_with_splits(
             per_class_score_generators,
             train_and_evaluate,
             batch_size,
+            n_jobs,
         )
 
         all_split_scores.append(scores)
@@ -396,6 +441,7 @@ def score_classification_models_for_dataset(
     per_class_score_generators: Sequence[Callable[[], BatchedPerClassProbabilitiesScore]],
     train_and_evaluate: Optional[TrainAndEvaluateModelFunction] = None,
     batch_size: int = 100,
+    n_jobs: int = 1,
 ) -> Tuple[MultiModelScores, MultiModelPerClassScores]:
     """Train, evaluate and score multiple models for the same training and test dataset.
 
@@ -421,17 +467,21 @@ def score_classification_models_for_dataset(
     batch_size : int, optional
         the batch size at which the model is evaluated and scored, by default 100; only applies to the default
         training and evaluation strategy
+    n_jobs : int, optional
+        the number of models that are trained and evaluated concurrently, by default 1; models are evaluated in
+        threads (not processes), since model and score generators are usually lambdas that can not be pickled, which
+        is only beneficial if models release the GIL during training and prediction (e.g. scikit-learn or torch);
+        models trained concurrently must not share any state, e.g., a vectorizer instance or a persisted vectorizer
+        cache, or torch models that change process-wide settings (TF32 matmul, default seeds); use the sequential
+        default if in doubt
 
     Returns
     -------
     Tuple[MultiModelScores, MultiModelPerClassScores]
         both the overall and per-class scores for each model
     """
-    all_model_scores = []
-    all_model_per_class_scores = []
-
-    for model_generator in model_generators:
-        scores, per_class_scores = score_classification_model_for_dataset(
+    def _score_model(model_generator: Callable[[], ClassificationModel]):
+        return score_classification_model_for_dataset(
             subject_order,
             train_dataset,
             test_dataset,
@@ -442,8 +492,15 @@ def score_classification_models_for_dataset(
             train_and_evaluate,
             batch_size,
         )
-        all_model_scores.append(scores)
-        all_model_per_class_scores.append(per_class_scores)
+
+    if n_jobs > 1 and len(model_generators) > 1:
+        with ThreadPoolExecutor(max_workers=min(n_jobs, len(model_generators))) as executor:
+            results = list(executor.map(_score_model, model_generators))
+    else:
+        results = [_score_model(model_generator) for model_generator in model_generators]
+
+    all_model_scores = [scores for scores, _ in results]
+    all_model_per_class_scores = [per_class_scores for _, per_class_scores in results]
 
     return all_model_scores, all_model_per_class_scores
 
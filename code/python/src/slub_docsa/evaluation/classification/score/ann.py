@@ -14,22 +14,18 @@ class TorchF1Score:
         self.t01_counts = None
         self.t05_counts = None
 
-    def _initalialize_counts(self, number_of_subjects):
-        self.t01_counts = [
-            np.zeros(number_of_subjects, dtype=np.int64),  # true positive
-            np.zeros(number_of_subjects, dtype=np.int64),  # false positive
-            np.zeros(number_of_subjects, dtype=np.int64),  # false negative
-        ]
-        self.t05_counts = [
-            np.zeros(number_of_subjects, dtype=np.int64),  # true positive
-            np.zeros(number_of_subjects, dtype=np.int64),  # false positive
-            np.zeros(number_of_subjects, dtype=np.int64),  # false negative
-        ]
+    def _initalialize_counts(self, number_of_subjects, device):
+        # counts of true positives, false positives and false negatives are kept on the device of the probabilities,
+        # such that they are only transferred to the host when the score is calculated
+        self.t01_counts = torch.zeros((3, number_of_subjects), dtype=torch.int64, device=device)
+        self.t05_counts = torch.zeros((3, number_of_subjects), dtype=torch.int64, device=device)
 
     def _add_counts(self, counts, true_inc, pred_inc):
-        counts[0] += (true_inc * pred_inc).sum(dim=0).cpu().detach().numpy().astype(np.uint32)
-        counts[1] += ((~true_inc) * pred_inc).sum(dim=0).cpu().detach().numpy().astype(np.uint32)
-        counts[2] += (true_inc * (~pred_inc)).sum(dim=0).cpu().detach().numpy().astype(np.uint32)
+        # derive false positives and false negatives from true positives instead of building complement tensors
+        true_positive = (true_inc & pred_inc).sum(dim=0)
+        counts[0] += true_positive
+        counts[1] += pred_inc.sum(dim=0) - true_positive
+        counts[2] += true_inc.sum(dim=0) - true_positive
 
     def add_batch(self, true_probabilities: torch.Tensor, predicted_probabilities: torch.Tensor):
         """Add multi-class subject probability matrices for a batch of documents to be processed for scoring.
@@ -42,7 +38,7 @@ class TorchF1Score:
             the matrix containing predicted subject probabilities in shape (document_batch, subjects).
         """
         if self.t01_counts is None or self.t05_counts is None:
-            self._initalialize_counts(true_probabilities.shape[1])
+            self._initalialize_counts(true_probabilities.shape[1], true_probabilities.device)
 
         true_incidences = true_probabilities >= 0.5
         t01_predicted_incidences = predicted_probabilities >= 0.1
@@ -56,10 +52,12 @@ class TorchF1Score:
         if self.t01_counts is None or self.t05_counts is None:
             distribution = subject_score_distribution_from_scores([])
             return (0.0, distribution), (0.0, distribution)
-        t01_f1 = f1_score(*map(np.sum, self.t01_counts))
-        t05_f1 = f1_score(*map(np.sum, self.t05_counts))
-        t01_f1_distribution = subject_score_distribution_from_scores(f1_score(*self.t01_counts))
-        t05_f1_distribution = subject_score_distribution_from_scores(f1_score(*self.t05_counts))
+        t01_counts = self.t01_counts.cpu().numpy()
+        t05_counts = self.t05_counts.cpu().numpy()
+        t01_f1 = f1_score(*map(np.sum, t01_counts))
+        t05_f1 = f1_score(*map(np.sum, t05_counts))
+        t01_f1_distribution = subject_score_distribution_from_scores(f1_score(*t01_counts))
+        t05_f1_distribution = subject_score_distribution_from_scores(f1_score(*t05_counts))
         return (t01_f1, t01_f1_distribution), (t05_f1, t05_f1_distribution)
 
 
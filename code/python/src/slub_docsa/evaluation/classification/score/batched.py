@@ -1,8 +1,11 @@
 """Batched score functions measuring classification performance."""
 
+# pylint: disable=too-many-instance-attributes
+
+import functools
 import logging
 
-from typing import Callable, Optional, Sequence
+from typing import Callable, Optional, Sequence, Tuple, cast
 
 import numpy as np
 from sklearn.metrics import log_loss
@@ -16,6 +19,50 @@ from slub_docsa.evaluation.classification.incidence import ThresholdIncidenceDec
 logger = logging.getLogger(__name__)
 
 
+def _count_per_class_confusion(
+    true_incidences: np.ndarray,
+    predicted_incidences: np.ndarray,
+    true_positive: np.ndarray,
+    false_positive: np.ndarray,
+    false_negative: np.ndarray,
+):
+    """Add per-class confusion counts of two incidence matrices in a single pass, meant to be compiled by numba."""
+    for i in range(true_incidences.shape[0]):
+        for j in range(true_incidences.shape[1]):
+            is_true = true_incidences[i, j] != 0
+            is_predicted = predicted_incidences[i, j] != 0
+            true_positive[j] += is_true & is_predicted
+            false_positive[j] += is_predicted & ~is_true
+            false_negative[j] += is_true & ~is_predicted
+
+
+def _apply_incidence_decision(
+    incidence_decision: IncidenceDecisionFunction,
+    probabilities: np.ndarray,
+    buffer: Optional[np.ndarray],
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Apply incidence decision, storing threshold decisions in a buffer that is re-used between batches.
+
+    Returns both the incidence matrix and the (possibly re-allocated) buffer, which is passed again for the next batch.
+    """
+    if not isinstance(incidence_decision, ThresholdIncidenceDecision):
+        return incidence_decision(probabilities), buffer
+    if buffer is None or buffer.shape != probabilities.shape:
+        buffer = np.empty(probabilities.shape, dtype=np.uint8)
+    return incidence_decision(probabilities, out=buffer), buffer
+
+
+@functools.lru_cache(maxsize=1)
+def _compiled_count_per_class_confusion() -> Optional[Callable]:
+    """Return `_count_per_class_confusion` compiled by numba, or None if numba is not installed."""
+    try:
+        import numba  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        logger.debug("numba is not installed, count per-class confusion via numpy")
+        return None
+    return numba.njit(cache=True)(_count_per_class_confusion)
+
+
 class BatchedConfusionScore(BatchedMultiClassIncidenceScore):
     """Abstract implementation of a score based on simple incidence counts."""
 
@@ -24,10 +71,15 @@ class BatchedConfusionScore(BatchedMultiClassIncidenceScore):
         self.true_positive = 0
         self.false_positive = 0
         self.false_negative = 0
+        self._buffer: Optional[np.ndarray] = None
 
     def add_batch(self, true_incidences: np.ndarray, predicted_incidences: np.ndarray):
         """Add a batch of incidence matrices.
 
+        Incidences are expected to contain only zeros and ones. False positives and false negatives are derived
+        from the number of true positives, such that only a single temporary matrix is required, which is re-used
+        between batches of the same shape.
+
         Parameters
         ----------
         true_incidences: np.ndarray
@@ -35,9 +87,29 @@ class BatchedConfusionScore(BatchedMultiClassIncidenceScore):
         predicted_incidences: np.ndarray
             the matrix containing predicted subject incidences in shape (document_batch, subjects).
         """
-        self.true_positive += (predicted_incidences * true_incidences).sum(dtype=int)
-        self.false_positive += ((1 - true_incidences) * predicted_incidences).sum(dtype=int)
-        self.false_negative += (true_incidences * (1 - predicted_incidences)).sum(dtype=int)
+        if self._buffer is None or self._buffer.shape != true_incidences.shape:
+            self._buffer = np.empty(true_incidences.shape, dtype=bool)
+        np.logical_and(true_incidences, predicted_incidences, out=self._buffer)
+        true_positive = int(np.count_nonzero(self._buffer))
+        self.true_positive += true_positive
+        self.false_positive += int(np.count_nonzero(predicted_incidences)) - true_positive
+        self.false_negative += int(np.count_nonzero(true_incidences)) - true_positive
+
+    def add_counts(self, true_positive: int, false_positive: int, false_negative: int):
+        """Add confusion counts that were already calculated for a batch of incidence matrices.
+
+        Parameters
+        ----------
+        true_positive: int
+            the number of true positive incidences
+        false_positive: int
+            the number of false positive incidences
+        false_negative: int
+            the number of false negative incidences
+        """
+        self.true_positive += int(true_positive)
+        self.false_positive += int(false_positive)
+        self.false_negative += int(false_negative)
 
     def __call__(self) -> float:
         """Abstract method that will calculate a score based on the collected confusion counts."""
@@ -90,7 +162,7 @@ class BatchedAccuracyScore(BatchedMultiClassIncidenceScore):
         predicted_incidences: np.ndarray
             the matrix containing predicted subject incidences in shape (document_batch, subjects).
         """
-        self.exact_hits += (true_incidences == predicted_incidences).all(axis=1).sum()
+        self.exact_hits += int(np.count_nonzero((true_incidences == predicted_incidences).all(axis=1)))
         self.total_samples += true_incidences.shape[0]
 
     def __call__(self) -> float:
@@ -103,7 +175,7 @@ class BatchedLogLossScore(BatchedMultiClassProbabilitiesScore):
 
     def __init__(self):
         """Initialize log loss score."""
-        self.loss_sum = 0
+        self.loss_sum = 0.0
         self.total_samples = 0
 
     def add_batch(self, true_probabilities: np.ndarray, predicted_probabilities: np.ndarray):
@@ -116,7 +188,7 @@ class BatchedLogLossScore(BatchedMultiClassProbabilitiesScore):
         predicted_probabilities: np.ndarray
             the matrix containing predicted subject probabilities in shape (document_batch, subjects).
         """
-        self.loss_sum += log_loss(true_probabilities, predicted_probabilities, normalize=False)
+        self.loss_sum += float(log_loss(true_probabilities, predicted_probabilities, normalize=False))
         self.total_samples += true_probabilities.shape[0]
 
     def __call__(self) -> float:
@@ -129,7 +201,7 @@ class BatchedMeanSquaredErrorScore(BatchedMultiClassProbabilitiesScore):
 
     def __init__(self):
         """Initialize mean squared error score."""
-        self.error_sum = 0
+        self.error_sum = 0.0
         self.total_samples = 0
 
     def add_batch(self, true_probabilities: np.ndarray, predicted_probabilities: np.ndarray):
@@ -142,7 +214,7 @@ class BatchedMeanSquaredErrorScore(BatchedMultiClassProbabilitiesScore):
         predicted_probabilities: np.ndarray
             the matrix containing predicted subject probabilities in shape (document_batch, subjects).
         """
-        self.error_sum += ((true_probabilities - predicted_probabilities)**2).sum()
+        self.error_sum += float(((true_probabilities - predicted_probabilities)**2).sum())
         self.total_samples += true_probabilities.shape[0]
 
     def __call__(self) -> float:
@@ -165,6 +237,8 @@ class BatchedIncidenceDecisionScore(BatchedMultiClassProbabilitiesScore):
         """
         self.incidence_decision = incidence_decision
         self.incidence_score = incidence_score
+        self._true_buffer: Optional[np.ndarray] = None
+        self._predicted_buffer: Optional[np.ndarray] = None
 
     def add_batch(self, true_probabilities: np.ndarray, predicted_probabilities: np.ndarray):
         """Add batch of probability matrices.
@@ -176,8 +250,12 @@ class BatchedIncidenceDecisionScore(BatchedMultiClassProbabilitiesScore):
         predicted_incidences: np.ndarray
             the matrix containing predicted subject probabilities in shape (document_batch, subjects).
         """
-        true_incidence = self.incidence_decision(true_probabilities)
-        predicted_incidence = self.incidence_decision(predicted_probabilities)
+        true_incidence, self._true_buffer = _apply_incidence_decision(
+            self.incidence_decision, true_probabilities, self._true_buffer
+        )
+        predicted_incidence, self._predicted_buffer = _apply_incidence_decision(
+            self.incidence_decision, predicted_probabilities, self._predicted_buffer
+        )
         self.incidence_score.add_batch(true_incidence, predicted_incidence)
 
     def __call__(self) -> float:
@@ -198,6 +276,7 @@ class BatchedBestThresholdScore(BatchedMultiClassProbabilitiesScore):
         score_generator: Callable[[], BatchedMultiClassIncidenceScore],
         optimizer_generator: Optional[Callable[[], BatchedMultiClassIncidenceScore]] = None,
         thresholds: Sequence[float] = None,
+        true_is_binary: bool = True,
     ):
         """Initialize with incidence score whose score is returned for the best threshold.
 
@@ -209,13 +288,61 @@ class BatchedBestThresholdScore(BatchedMultiClassProbabilitiesScore):
             the incidence score that is used to find the best score, if None, the f1 score is used
         thresholds : Sequence[float], optional
             the sequence of thresholds that are checked, by default [0.1, 0.2, ..., 0.9]
+        true_is_binary : bool, optional
+            whether true probabilities are always zero or one (as for subject targets), by default True; in this case,
+            true incidences are the same for every (positive) threshold and are only determined once per batch; set to
+            False when scoring against true probabilities that are not binary
         """
         self.optimizer_generator = optimizer_generator or BatchedF1Score
         self.score_generator = score_generator
         self.thresholds = thresholds or [i / 10.0 + 0.1 for i in range(9)]
+        self.true_is_binary = true_is_binary
 
+        self.incidence_decisions = [ThresholdIncidenceDecision(threshold) for threshold in self.thresholds]
+        self._broadcast_thresholds = np.asarray(self.thresholds).reshape(-1, 1, 1)
         self.optimizers = [self.optimizer_generator() for _ in self.thresholds]
         self.scores = [self.score_generator() for _ in self.thresholds]
+        self.only_confusion_scores = all(
+            isinstance(score, BatchedConfusionScore) for score in self.optimizers + self.scores
+        )
+        self._true_buffer: Optional[np.ndarray] = None
+        self._predicted_buffer: Optional[np.ndarray] = None
+
+    def _incidence_buffers(self, shape: Sequence[int], dtype) -> Tuple[np.ndarray, np.ndarray]:
+        """Return re-usable buffers for true and predicted incidences, which are re-allocated if the shape changes."""
+        if self._true_buffer is None or self._predicted_buffer is None \
+                or self._true_buffer.shape != tuple(shape) or self._true_buffer.dtype != dtype:
+            self._true_buffer = np.empty(shape, dtype=dtype)
+            self._predicted_buffer = np.empty(shape, dtype=dtype)
+        return self._true_buffer, self._predicted_buffer
+
+    def _add_batch_for_all_thresholds(self, true_probabilities: np.ndarray, predicted_probabilities: np.ndarray):
+        """Add confusion counts for all thresholds at once by broadcasting the threshold comparison."""
+        thresholds = self._broadcast_thresholds
+        true_incidences, predicted_incidences = self._incidence_buffers(
+            (len(self.thresholds),) + true_probabilities.shape, bool
+        )
+        np.greater_equal(predicted_probabilities[np.newaxis], thresholds, out=predicted_incidences)
+        predicted_count = np.count_nonzero(predicted_incidences, axis=(1, 2))
+
+        if self.true_is_binary:
+            # true incidences are the same for every threshold, only compare predicted incidences against them
+            true_incidence = true_probabilities != 0
+            true_count = np.count_nonzero(true_incidence)
+            np.logical_and(predicted_incidences, true_incidence[np.newaxis], out=true_incidences)
+        else:
+            np.greater_equal(true_probabilities[np.newaxis], thresholds, out=true_incidences)
+            true_count = np.count_nonzero(true_incidences, axis=(1, 2))
+            np.logical_and(true_incidences, predicted_incidences, out=true_incidences)
+        true_positive = np.count_nonzero(true_incidences, axis=(1, 2))
+        false_positive = predicted_count - true_positive
+        false_negative = true_count - true_positive
+
+        for i in range(len(self.thresholds)):
+            for confusion_score in (self.optimizers[i], self.scores[i]):
+                cast(BatchedConfusionScore, confusion_score).add_counts(
+                    true_positive[i], false_positive[i], false_negative[i]
+                )
 
     def add_batch(self, true_probabilities: np.ndarray, predicted_probabilities: np.ndarray):
         """Add batch of probability matrices.
@@ -227,9 +354,18 @@ class BatchedBestThresholdScore(BatchedMultiClassProbabilitiesScore):
         predicted_incidences: np.ndarray
             the matrix containing predicted subject probabilities in shape (document_batch, subjects).
         """
-        for i, threshold in enumerate(self.thresholds):
-            true_incidence = ThresholdIncidenceDecision(threshold)(true_probabilities)
-            predicted_incidence = ThresholdIncidenceDecision(threshold)(predicted_probabilities)
+        if self.only_confusion_scores:
+            self._add_batch_for_all_thresholds(true_probabilities, predicted_probabilities)
+            return
+
+        # apply threshold incidence decisions into the same buffers for every threshold
+        true_incidence, predicted_incidence = self._incidence_buffers(true_probabilities.shape, np.uint8)
+        if self.true_is_binary:
+            np.not_equal(true_probabilities, 0, out=true_incidence)
+        for i, incidence_decision in enumerate(self.incidence_decisions):
+            if not self.true_is_binary:
+                incidence_decision(true_probabilities, out=true_incidence)
+            incidence_decision(predicted_probabilities, out=predicted_incidence)
             self.optimizers[i].add_batch(true_incidence, predicted_incidence)
             self.scores[i].add_batch(true_incidence, predicted_incidence)
 
@@ -258,6 +394,10 @@ class BatchedPerClassConfusionScore(BatchedPerClassIncidenceScore):
     def add_batch(self, true_incidences: np.ndarray, predicted_incidences: np.ndarray):
         """Add a batch of incidence matrices.
 
+        Incidences are expected to contain only zeros and ones. False positives and false negatives are derived
+        from the number of true positives of each subject, such that no complement matrices are required. Counts are
+        accumulated as integers.
+
         Parameters
         ----------
         true_incidences: np.ndarray
@@ -266,12 +406,27 @@ class BatchedPerClassConfusionScore(BatchedPerClassIncidenceScore):
             the matrix containing predicted subject probabilities in shape (document_batch, subjects).
         """
         if self.true_positive is None or self.false_positive is None or self.false_negative is None:
-            self.true_positive = np.zeros(true_incidences.shape[1])
-            self.false_positive = np.zeros(true_incidences.shape[1])
-            self.false_negative = np.zeros(true_incidences.shape[1])
-        self.true_positive += (predicted_incidences * true_incidences).sum(axis=0)
-        self.false_positive += ((1 - true_incidences) * predicted_incidences).sum(axis=0)
-        self.false_negative += (true_incidences * (1 - predicted_incidences)).sum(axis=0)
+            self.true_positive = np.zeros(true_incidences.shape[1], dtype=np.int64)
+            self.false_positive = np.zeros(true_incidences.shape[1], dtype=np.int64)
+            self.false_negative = np.zeros(true_incidences.shape[1], dtype=np.int64)
+
+        # count all confusions in a single pass if numba is available
+        compiled_count = _compiled_count_per_class_confusion()
+        if compiled_count is not None and true_incidences.dtype in (np.uint8, np.bool_) \
+                and predicted_incidences.dtype in (np.uint8, np.bool_):
+            compiled_count(
+                np.ascontiguousarray(true_incidences),
+                np.ascontiguousarray(predicted_incidences),
+                self.true_positive,
+                self.false_positive,
+                self.false_negative
+            )
+            return
+
+        true_positive = np.count_nonzero(np.logical_and(true_incidences, predicted_incidences), axis=0)
+        self.true_positive += true_positive
+        self.false_positive += np.count_nonzero(predicted_incidences, axis=0) - true_positive
+        self.false_negative += np.count_nonzero(true_incidences, axis=0) - true_positive
 
     def __call__(self) -> Sequence[float]:
         """Abstract method that will calculate a score based on the collected confusion counts."""
@@ -321,6 +476,8 @@ class BatchedIncidenceDecisionPerClassScore(BatchedPerClassProbabilitiesScore):
         """
         self.incidence_decision = incidence_decision
         self.confusion_score = incidence_score
+        self._true_buffer: Optional[np.ndarray] = None
+        self._predicted_buffer: Optional[np.ndarray] = None
 
     def add_batch(self, true_probabilities: np.ndarray, predicted_probabilities: np.ndarray):
         """Add batch of probability matrices.
@@ -332,8 +489,12 @@ class BatchedIncidenceDecisionPerClassScore(BatchedPerClassProbabilitiesScore):
         predicted_incidences: np.ndarray
             the matrix containing predicted subject probabilities in shape (document_batch, subjects).
         """
-        true_incidence = self.incidence_decision(true_probabilities)
-        predicted_incidence = self.incidence_decision(predicted_probabilities)
+        true_incidence, self._true_buffer = _apply_incidence_decision(
+            self.incidence_decision, true_probabilities, self._true_buffer
+        )
+        predicted_incidence, self._predicted_buffer = _apply_incidence_decision(
+            self.incidence_decision, predicted_probabilities, self._predicted_buffer
+        )
         self.confusion_score.add_batch(true_incidence, predicted_incidence)
 
     def __call__(self) -> Sequence[float]:
@@ -356,6 +517,9 @@ class BatchedNumberOfTestExamplesPerClass(BatchedPerClassProbabilitiesScore):
     def add_batch(self, true_probabilities: np.ndarray, predicted_probabilities: np.ndarray):
         """Add batch of probability matrices.
 
+        True probabilities are expected to be non-negative, such that positive entries can be counted without
+        allocating a boolean matrix.
+
         Parameters
         ----------
         true_incidences: np.ndarray
@@ -364,8 +528,8 @@ class BatchedNumberOfTestExamplesPerClass(BatchedPerClassProbabilitiesScore):
             the matrix containing predicted subject probabilities in shape (document_batch, subjects).
         """
         if self.counts is None:
-            self.counts = np.zeros(true_probabilities.shape[1])
-        self.counts += (true_probabilities > 0.0).sum(axis=0)
+            self.counts = np.zeros(true_probabilities.shape[1], dtype=np.int64)
+        self.counts += np.count_nonzero(true_probabilities, axis=0)
 
     def __call__(self) -> Sequence[float]:
         """Return the number of test examples for each subject."""
@@ -95,12 +95,13 @@ def absolute_confusion_from_incidence(
     bool_true_incidence = true_incidence > 0.0
     bool_predicted_incidence = predicted_incidence > 0.0
 
-    true_positives = (bool_true_incidence & bool_predicted_incidence)
-    true_negatives = (~bool_true_incidence & ~bool_predicted_incidence)
-    false_positives = (~bool_true_incidence & bool_predicted_incidence)
-    false_negatives = (bool_true_incidence & ~bool_predicted_incidence)
+    # derive all other counts from the number of true positives instead of building complement matrices
+    true_positives = np.count_nonzero(bool_true_incidence & bool_predicted_incidence)
+    false_positives = np.count_nonzero(bool_predicted_incidence) - true_positives
+    false_negatives = np.count_nonzero(bool_true_incidence) - true_positives
+    true_negatives = bool_true_incidence.size - true_positives - false_positives - false_negatives
 
-    return np.sum(true_positives), np.sum(true_negatives), np.sum(false_positives), np.sum(false_negatives)
+    return true_positives, true_negatives, false_positives, false_negatives
 
 
 def subject_score_distribution_from_scores(scores: Sequence[float]) -> Sequence[int]:
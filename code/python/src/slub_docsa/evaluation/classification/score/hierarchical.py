@@ -59,6 +59,7 @@ def cesa_bianchi_loss_for_sample_generator(
         return _nan_results
 
     number_of_root_nodes = sum(1 for _ in subject_hierarchy.root_subjects())
+    subject_order_map = {s_uri: i for i, s_uri in enumerate(subject_order)}
 
     def _find_ancestor_with_error(
             subject_uri: str,
@@ -70,24 +71,31 @@ def cesa_bianchi_loss_for_sample_generator(
         ancestors = subject_ancestors_list(subject_uri, subject_hierarchy)
         previous_ancestor = ancestors[-1]
         for ancestor in reversed(ancestors[:-1]):
-            if ancestor in subject_order:
-                ancestor_id = subject_order.index(ancestor)
-                if incidence_list[ancestor_id] == 1:
-                    break
+            ancestor_id = subject_order_map.get(ancestor)
+            if ancestor_id is not None and incidence_list[ancestor_id] == 1:
+                break
             previous_ancestor = ancestor
         return previous_ancestor
 
     def _h_loss(true_array: np.ndarray, predicted_array: np.ndarray) -> float:
+        if np.array_equal(true_array, predicted_array):
+            # there are no mistakes, no need to extend incidences to ancestors
+            return 0.0
+
         subjects_with_errors = set()
         true_list = true_array.tolist()
         pred_list = predicted_array.tolist()
 
-        ext_true_list = extend_incidence_list_to_ancestors(subject_hierarchy, subject_order, true_list)
-        ext_pred_list = extend_incidence_list_to_ancestors(subject_hierarchy, subject_order, pred_list)
+        ext_true_list = extend_incidence_list_to_ancestors(
+            subject_hierarchy, subject_order, true_list, subject_order_map
+        )
+        ext_pred_list = extend_incidence_list_to_ancestors(
+            subject_hierarchy, subject_order, pred_list, subject_order_map
+        )
 
-        # look for false negative errors
-        for i, value in enumerate(true_list):
-            if value == 1 and ext_pred_list[i] == 0:
+        # look for false negative errors, only checking subjects that are actually marked
+        for i in np.flatnonzero(true_array == 1):
+            if ext_pred_list[i] == 0:
                 # there is an error here, lets find out at which level
                 subject_uri = subject_order[i]
                 subjects_with_errors.add(_find_ancestor_with_error(
@@ -97,8 +105,8 @@ def cesa_bianchi_loss_for_sample_generator(
                 ))
 
         # look for false positive errors
-        for i, value in enumerate(pred_list):
-            if value == 1 and ext_true_list[i] == 0:
+        for i in np.flatnonzero(predicted_array == 1):
+            if ext_true_list[i] == 0:
                 subject_uri = subject_order[i]
                 subjects_with_errors.add(_find_ancestor_with_error(
                     subject_uri,
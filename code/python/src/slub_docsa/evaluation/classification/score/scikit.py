@@ -4,8 +4,9 @@
 
 import logging
 
+from typing import Sequence
+
 import numpy as np
-from sklearn.metrics import f1_score
 
 from slub_docsa.common.score import PerClassProbabilitiesScore
 from slub_docsa.common.score import IncidenceDecisionFunction
@@ -75,6 +76,38 @@ def scikit_incidence_metric(
     return _metric
 
 
+def _micro_f1_scores_for_thresholds(
+    true_incidence: np.ndarray,
+    predicted_probabilities: np.ndarray,
+    thresholds: Sequence[float],
+) -> np.ndarray:
+    """Return the micro f1 score of threshold incidence decisions for every threshold in a single pass.
+
+    Probabilities are sorted once, such that the number of predicted and true positive incidences for each threshold
+    can be looked up from cumulative counts instead of deciding and scoring a full incidence matrix per threshold.
+    Matches scikit's `f1_score` with `average="micro"` and `zero_division=0` for binary true incidences.
+    """
+    probabilities = np.ravel(predicted_probabilities)
+    order = np.argsort(probabilities, kind="stable")
+    sorted_probabilities = probabilities[order]
+    true_cumulative = np.concatenate([[0], np.cumsum(np.ravel(true_incidence)[order] != 0)])
+    total_true = true_cumulative[-1]
+
+    # compare thresholds at the precision of the probabilities, as done when deciding incidences via numpy
+    threshold_array = np.asarray(thresholds)
+    if np.issubdtype(sorted_probabilities.dtype, np.floating):
+        threshold_array = threshold_array.astype(sorted_probabilities.dtype)
+
+    # probabilities at and after the first index not less than a threshold are decided as positive
+    first_positive = np.searchsorted(sorted_probabilities, threshold_array, side="left")
+    predicted_positive = probabilities.shape[0] - first_positive
+    true_positive = total_true - true_cumulative[first_positive]
+    denominator = predicted_positive + total_true
+    return np.divide(
+        2.0 * true_positive, denominator, out=np.zeros(len(thresholds), dtype=np.float64), where=denominator > 0
+    )
+
+
 def scikit_metric_for_best_threshold_based_on_f1score(
     metric_function: MultiClassIncidenceScore,
     **kwargs
@@ -101,30 +134,14 @@ def scikit_metric_for_best_threshold_based_on_f1score(
         best incidence threshold (by chosing a threshold that maximizes the f1 score) and then applying the metric
         function
     """
+    incidence_decisions = [ThresholdIncidenceDecision(i / 10.0 + 0.1) for i in range(9)]
+    thresholds = [incidence_decision.threshold for incidence_decision in incidence_decisions]
 
     def _decision(true_incidence, predicted_probabilities: np.ndarray) -> np.ndarray:
-        best_score = -1
-        best_threshold = None
-        best_incidence = np.zeros((2, 2))
-        for threshold in [i / 10.0 + 0.1 for i in range(9)]:
-            score = scikit_incidence_metric(
-                ThresholdIncidenceDecision(threshold),
-                f1_score,
-                average="micro",
-                zero_division=0
-            )(
-                true_incidence,
-                predicted_probabilities
-            )
-            # logger.debug("score for threshold t=%f is %f", t, score)
-
-            if score > best_score:
-                best_incidence = ThresholdIncidenceDecision(threshold)(predicted_probabilities)
-                best_score = score
-                best_threshold = threshold
-
-        logger.debug("found best f1_score for incidence based on threshold t=%f", best_threshold)
-        return best_incidence
+        scores = _micro_f1_scores_for_thresholds(true_incidence, predicted_probabilities, thresholds)
+        best_incidence_decision = incidence_decisions[int(np.argmax(scores))]
+        logger.debug("found best f1_score for incidence based on threshold t=%f", best_incidence_decision.threshold)
+        return best_incidence_decision(predicted_probabilities)
 
     def _metric(
         true_subject_incidence: np.ndarray,
@@ -49,8 +49,7 @@ def score_clustering_models_for_documents(
         a score matrix of shape `(len(models), len(scores), repeats)`, which contains every score for every evaluated
         clustering model
     """
-    score_matrix = np.empty((repeats, len(models), len(score_generators)))
-    score_matrix[:, :, :] = np.NaN
+    score_matrix = np.full((repeats, len(models), len(score_generators)), np.nan)
 
     for i in range(repeats):
 
@@ -12,6 +12,7 @@ from slub_docsa.common.document import Document
 from slub_docsa.common.subject import SubjectTargets
 from slub_docsa.data.preprocess.document import document_as_concatenated_string
 from slub_docsa.data.preprocess.vectorizer import AbstractVectorizer
+from slub_docsa.data.store.array import vectors_as_matrix
 from slub_docsa.common.similarity import IndexedDocumentDistanceFunction, IndexedDocumentDistanceGenerator
 
 logger = logging.getLogger(__name__)
@@ -66,11 +67,12 @@ def intra_cluster_distance(
         the intra cluster distance by averaging all distances of pairwise elements within a cluster weighted by their
         membership degree
     """
-    n_clusters = membership.shape[1]
+    # transpose membership once, such that the memberships of each cluster are contiguous in memory
+    membership_per_cluster = np.ascontiguousarray(membership.T)
     intra_distances = []
-    for cluster_idx in range(n_clusters):
+    for cluster_idx, cluster_membership in enumerate(membership_per_cluster):
         # get idxs of documents belonging to current cluster
-        document_idxs = np.where(membership[:, cluster_idx] > 0.0)[0]
+        document_idxs = np.flatnonzero(cluster_membership > 0.0)
         logger.debug("intra cluster distance for cluster %d containing %d documents", cluster_idx, len(document_idxs))
         if max_documents_per_cluster is not None and len(document_idxs) > max_documents_per_cluster:
             document_idxs = np.random.choice(document_idxs, size=max_documents_per_cluster)
@@ -78,7 +80,7 @@ def intra_cluster_distance(
             intra_distance = 0
             n_combinations = 0
             for d1_idx, d2_idx in itertools.combinations(document_idxs, 2):
-                factor = membership[d1_idx, cluster_idx] * membership[d2_idx, cluster_idx]
+                factor = cluster_membership[d1_idx] * cluster_membership[d2_idx]
                 distance = distance_function(d1_idx, d2_idx)
                 # logger.debug("distance is %f", distance)
                 intra_distance += factor * distance
@@ -114,9 +116,11 @@ def indexed_document_distance_generator_from_vectorizer(
         membership: np.ndarray,
         subject_targets: Optional[SubjectTargets],
     ) -> IndexedDocumentDistanceFunction:
-        corpus = [document_as_concatenated_string(d) for d in documents]
-        vectorizer.fit(iter(corpus))
-        vectors = np.array(list(vectorizer.transform(iter(corpus))))
+        # concatenate documents lazily for each pass instead of keeping the whole corpus as strings in memory
+        vectorizer.fit(document_as_concatenated_string(d) for d in documents)
+        vectors = vectors_as_matrix(
+            vectorizer.transform(document_as_concatenated_string(d) for d in documents), len(documents)
+        )
 
         def _distance(idx1: int, idx2: int) -> float:
             return vector_distance(vectors[idx1], vectors[idx2])
@@ -14,7 +14,7 @@ from slub_docsa.evaluation.classification.incidence import subject_incidence_mat
 from slub_docsa.evaluation.classification.score.scikit import scikit_metric_for_best_threshold_based_on_f1score
 from slub_docsa.evaluation.classification.split import scikit_kfold_train_test_split
 from slub_docsa.serve.common import PublishedClassificationModelStatistics, current_date_as_model_creation_date
-from slub_docsa.serve.rest.service.models import classify_with_limit_and_threshold
+from slub_docsa.serve.rest.service.models import limit_and_threshold_probabilities
 from slub_docsa.data.store.model import PublishedClassificationModelInfo
 from slub_docsa.data.store.model import default_published_classification_models_directory
 from slub_docsa.data.store.model import load_published_classification_model
@@ -23,14 +23,10 @@ from slub_docsa.data.store.model import save_as_published_classification_model
 
 logger = logging.getLogger(__name__)
 
-
-def _evaluate_model(model, test_dataset, subject_order):
-    predicted_probabilities = model.predict_proba(test_dataset.documents)
-    test_incidence = subject_incidence_matrix_from_targets(test_dataset.subjects, subject_order)
-    score = scikit_metric_for_best_threshold_based_on_f1score(
-        f1_score, average="micro", zero_division=0
-    )(test_incidence, predicted_probabilities)
-    return score
+_BEST_THRESHOLD_F1_SCORE = scikit_metric_for_best_threshold_based_on_f1score(
+    f1_score, average="micro", zero_division=0
+)
+"""The score function that is used to evaluate a model before and after it is persisted."""
 
 
 def _default_model_directory(model_id):
@@ -42,17 +38,15 @@ def _default_model_id(dataset_name, model_type):
     return dataset_name + "__" + model_type
 
 
-def _evaluate_published_model(model_id, model_types, test_dataset, subject_order):
+def _evaluate_published_model(model_id, model_types, test_dataset, test_incidence):
     logger.info("load and evaluate persisted model")
     model_directory = _default_model_directory(model_id)
     schema_generators = default_schema_generators()
     published_model = load_published_classification_model(model_directory, model_types, schema_generators)
-    classify_with_limit_and_threshold(
-        published_model.model,
-        test_dataset.documents,
-        limit=3
-    )
-    persisted_f1_score = _evaluate_model(published_model.model, test_dataset, subject_order)
+    # predict test documents only once, both to check classification results and to score the persisted model
+    predicted_probabilities = published_model.model.predict_proba(test_dataset.documents)
+    limit_and_threshold_probabilities(predicted_probabilities, limit=3)
+    persisted_f1_score = _BEST_THRESHOLD_F1_SCORE(test_incidence, predicted_probabilities)
     logger.info(
         "score after persisting is %.5f for model '%s'", persisted_f1_score, model_id
     )
@@ -70,6 +64,7 @@ def publish_model(model_generator, model_type, dataset, dataset_name, subject_hi
     subject_order = unique_subject_order(dataset.subjects)
     train_dataset, test_dataset = scikit_kfold_train_test_split(0.9, dataset, random_state=random_state)
     train_incidence = subject_incidence_matrix_from_targets(train_dataset.subjects, subject_order)
+    test_incidence = subject_incidence_matrix_from_targets(test_dataset.subjects, subject_order)
     subject_hierarchy = subject_hierarchy_generator()
 
     logger.info("loading model '%s'", model_id)
@@ -80,7 +75,7 @@ def publish_model(model_generator, model_type, dataset, dataset_name, subject_hi
     model.fit(train_dataset.documents, train_incidence)
 
     logger.info("evaluate model %s", str(model))
-    test_dataset_f1_score = _evaluate_model(model, test_dataset, subject_order)
+    test_dataset_f1_score = _BEST_THRESHOLD_F1_SCORE(test_incidence, model.predict_proba(test_dataset.documents))
     logger.info("f1 score before persisting %f", test_dataset_f1_score)
 
     logger.info("save model with id '%s'", model_id)
@@ -109,4 +104,4 @@ def publish_model(model_generator, model_type, dataset, dataset_name, subject_hi
         )
     )
 
-    _evaluate_published_model(model_id, {model_type: model_generator}, test_dataset, subject_order)
+    _evaluate_published_model(model_id, {model_type: model_generator}, test_dataset, test_incidence)
@@ -3,7 +3,9 @@
 # pylint: disable=invalid-name,too-many-locals
 
 import logging
+import os
 
+from slub_docsa.common.paths import get_cache_dir
 from slub_docsa.experiments.common.datasets import filter_and_cache_named_datasets
 from slub_docsa.experiments.common.publish import publish_model
 from slub_docsa.experiments.qucosa.datasets import qucosa_named_sample_generators
@@ -20,7 +22,10 @@ if __name__ == "__main__":
     dataset_name = "qucosa_de_titles_rvk"
     model_type = "something"
 
-    model_generator = get_all_classification_model_types()[model_type]
+    # persist stemmed texts, such that models published for the same dataset only stem the same texts once
+    model_generator = get_all_classification_model_types(
+        stemming_cache_dir=os.path.join(get_cache_dir(), "stemming/publish")
+    )[model_type]
 
     _, dataset, subject_hierarchy_genereator = next(filter_and_cache_named_datasets(
         qucosa_named_sample_generators(check_qucosa_download), [dataset_name]
@@ -3,26 +3,32 @@
 # pylint: disable=fixme, invalid-name, no-member, too-many-locals, too-many-statements, too-many-arguments
 # pylint: disable=too-many-instance-attributes, too-few-public-methods
 
+import contextlib
 import logging
 import os
 import pickle  # nosec
 import time
 
-from typing import Any, Optional, Sequence
+from itertools import chain
+from typing import Any, Iterable, Optional, Sequence, Union
 
 import numpy as np
 import torch
 import transformers
 
+from scipy.sparse import csr_matrix, issparse
+
+from torch.nn.parallel import DistributedDataParallel
 from torch.utils.data import DataLoader, IterableDataset, Dataset as TorchDataset
+from torch.utils.data.distributed import DistributedSampler
 from torch.nn import BCEWithLogitsLoss
 from torch.optim import Adam
-from torch.optim.lr_scheduler import ExponentialLR
 
 from slub_docsa.common.model import PersistableClassificationModel
 from slub_docsa.common.document import Document
 from slub_docsa.data.preprocess.document import document_as_concatenated_string
 from slub_docsa.data.preprocess.vectorizer import AbstractVectorizer, PersistableVectorizerMixin
+from slub_docsa.data.store.array import vectors_as_matrix
 from slub_docsa.evaluation.classification.score.ann import TorchF1Score
 from slub_docsa.evaluation.classification.plotting import ann_training_history_plot, write_multiple_figure_formats
 
@@ -30,6 +36,52 @@ logger = logging.getLogger(__name__)
 
 TORCH_MODEL_STATE_FILENAME = "torch_model_state.pickle"
 TORCH_MODEL_SHAPE_FILENAME = "torch_model_shape.pickle"
+DENSE_PREDICTION_BATCH_SIZE = 1024
+
+
+def _collect_sparse_features(features: Iterable[np.ndarray], number_of_features: int) -> csr_matrix:
+    """Collect feature vectors that mostly contain zeros (e.g. tfidf vectors) in a sparse float32 matrix."""
+    indptr = [0]
+    indices = []
+    data = []
+    size = 0
+    for feature in features:
+        non_zero = np.flatnonzero(feature)
+        indices.append(non_zero)
+        data.append(feature[non_zero].astype(np.float32))
+        indptr.append(indptr[-1] + non_zero.shape[0])
+        size = feature.shape[0]
+    if len(indptr) - 1 != number_of_features:
+        raise ValueError(f"vectorizer returned {len(indptr) - 1} instead of {number_of_features} features")
+    return csr_matrix(
+        (np.concatenate(data), np.concatenate(indices), np.array(indptr)), shape=(number_of_features, size)
+    )
+
+
+def _collect_features(
+    features: Iterable[Any],
+    number_of_features: int,
+    sparse: bool = False,
+    memmap_directory: Optional[str] = None,
+) -> Union[np.ndarray, csr_matrix, Sequence[Any]]:
+    """Collect dense feature vectors in a pre-allocated float32 matrix, and other features (e.g. encodings) as list.
+
+    Dense feature vectors are collected via `vectors_as_matrix`, optionally memory-mapped in `memmap_directory`. If
+    `sparse` is true, one-dimensional feature vectors are collected in a sparse matrix instead.
+    """
+    features_iterator = iter(features)
+    first_feature = next(features_iterator, None)
+    if first_feature is None:
+        if number_of_features > 0:
+            raise ValueError(f"vectorizer returned no features instead of {number_of_features} features")
+        return []
+    if not isinstance(first_feature, np.ndarray):
+        return [first_feature, *features_iterator]
+    if sparse and first_feature.ndim == 1:
+        return _collect_sparse_features(chain([first_feature], features_iterator), number_of_features)
+    return vectors_as_matrix(
+        chain([first_feature], features_iterator), number_of_features, np.float32, memmap_directory
+    )
 
 
 class SimpleIterableDataset(IterableDataset):
@@ -80,8 +132,15 @@ class LazyIndexedDataset(TorchDataset):
         subject_targets: Optional[Sequence[np.ndarray]] = None,
         max_document_length: Optional[int] = 10000,
         preload: bool = False,
+        sparse: bool = False,
+        memmap_directory: Optional[str] = None,
     ):
-        """Initialize dataset with a sequence of features and subject incidences."""
+        """Initialize dataset with a sequence of features and subject incidences.
+
+        Preloaded features are stored as sparse matrix if `sparse` is true, and converted to dense vectors only when
+        a sample is requested. Otherwise, preloaded features are stored in a memory-mapped file in `memmap_directory`
+        if it is given.
+        """
         self.vectorizer = vectorizer
         self.documents = documents
         self.subject_targets = subject_targets
@@ -92,11 +151,15 @@ class LazyIndexedDataset(TorchDataset):
             text_iterator = (
                 document_as_concatenated_string(d, max_length=self.max_document_length) for d in self.documents
             )
-            self.features = list(self.vectorizer.transform(text_iterator))
+            self.features = _collect_features(
+                self.vectorizer.transform(text_iterator), len(self.documents), sparse, memmap_directory
+            )
 
     def __getitem__(self, idx):
         """Return a specific tuple of feature and subject incidence vector at index position."""
-        if self.features:
+        if issparse(self.features):
+            features = self.features[idx].toarray()[0]
+        elif self.features is not None:
             features = self.features[idx]
         else:
             text_iterator = iter([
@@ -115,7 +178,7 @@ class LazyIndexedDataset(TorchDataset):
 class ProgressLogger:
     """Helper class to print log message during training and testing."""
 
-    def __init__(self, stage: str, batch_size: int, score: TorchF1Score):
+    def __init__(self, stage: str, batch_size: int, score: Optional[TorchF1Score]):
         """Initialize progress logger."""
         self.batch_size = batch_size
         self.last_log_time = time.time()
@@ -128,8 +191,7 @@ class ProgressLogger:
         passed_time = time.time() - self.last_log_time
         if passed_time > 5.0 or end_of_epoch:
             samples_per_second = ((current_batch - self.last_log_batch) * self.batch_size) / passed_time
-            current_avg_loss = cumulative_epoch_loss / (current_batch + 1)
-            t01_f1, t05_f1 = self.score()
+            current_avg_loss = float(cumulative_epoch_loss) / (current_batch + 1)
 
             # print logs
             if end_of_epoch:
@@ -144,8 +206,10 @@ class ProgressLogger:
                     self.stage, current_batch, samples_per_second, current_avg_loss
                 )
 
-            logger.info("f1_t=0.1 total %.4f, distriubution %s", t01_f1[0], t01_f1[1])
-            logger.info("f1_t=0.5 total %.4f, distriubution %s", t05_f1[0], t05_f1[1])
+            if self.score is not None:
+                t01_f1, t05_f1 = self.score()
+                logger.info("f1_t=0.1 total %.4f, distriubution %s", t01_f1[0], t01_f1[1])
+                logger.info("f1_t=0.5 total %.4f, distriubution %s", t05_f1[0], t05_f1[1])
 
             # update time
             self.last_log_time = time.time()
@@ -172,8 +236,16 @@ class AbstractTorchModel(PersistableClassificationModel):
         positive_class_weight_decay: float = 1.0,
         max_document_length: Optional[int] = 10000,
         preload_vectorizations: bool = True,
+        sparse_vectorizations: bool = False,
+        preload_memmap_directory: Optional[str] = None,
         dataloader_workers: int = 0,
         plot_training_history_filepath: Optional[str] = None,
+        mixed_precision: bool = False,
+        tf32_matmul: bool = True,
+        compile_model: bool = False,
+        compile_mode: Optional[str] = None,
+        distributed: bool = False,
+        score_epochs_interval: int = 1,
     ):
         """Initialize model.
 
@@ -191,9 +263,38 @@ class AbstractTorchModel(PersistableClassificationModel):
             the positive class weight that is assigned to all positive cases (1.0 means no extra weight)
         positive_class_weight_decay: float = 1.0
             the decay factor that is applied to the positive class weight on each training epoch (1.0 means no decay)
+        sparse_vectorizations: bool = False
+            whether to store preloaded feature vectors as sparse matrix, which saves memory for vectorizers whose
+            vectors mostly contain zeros (e.g. tfidf); vectors are converted to dense vectors for each batch
+        preload_memmap_directory: Optional[str] = None
+            the directory in which preloaded dense feature vectors are stored as memory-mapped temporary file instead
+            of keeping them in memory, which allows to train with datasets whose features do not fit into memory
         plot_training_history_filepath: Optional[str] = None
             the path to the training history plot
+        mixed_precision: bool = False
+            whether to evaluate the network in bfloat16 via autocast, which only applies to cuda devices that support
+            bfloat16; no gradient scaling is required since bfloat16 has the same dynamic range as float32
+        tf32_matmul: bool = True
+            whether to allow TensorFloat-32 tensor cores for float32 matrix multiplications and convolutions on cuda
+            devices (Ampere or newer), which applies to all operations not covered by mixed precision; note that this
+            is a global torch setting that affects the whole process
+        compile_model: bool = False
+            whether to compile the network via `torch.compile` for training, validation and prediction, which fuses
+            operations at the cost of an initial compilation time; requires torch 2.0 or newer
+        compile_mode: Optional[str] = None
+            the mode passed to `torch.compile`, e.g. "max-autotune" to search for the fastest kernels and replay them
+            via cuda graphs, by default None (the default mode of torch)
+        distributed: bool = False
+            whether to train the network via `DistributedDataParallel` on the gpu given by the environment variable
+            `LOCAL_RANK` (e.g. as set by `torchrun`), which only applies if the default process group was initialized
+            via `torch.distributed.init_process_group` before calling `fit`
+        score_epochs_interval: int = 1
+            the number of epochs after which training and validation f1 scores are calculated again, such that scores
+            are skipped for all other epochs (reported as nan); stopping at `max_training_t05_f1` is only checked for
+            epochs that were scored
         """
+        if not isinstance(score_epochs_interval, int) or score_epochs_interval < 1:
+            raise ValueError(f"score epochs interval must be an integer of at least 1, not {score_epochs_interval}")
         self.vectorizer = vectorizer
         self.max_epochs = max_epochs
         self.max_training_time = max_training_time
@@ -208,14 +309,70 @@ class AbstractTorchModel(PersistableClassificationModel):
         self.positive_class_weight_decay = positive_class_weight_decay
         self.max_document_length = max_document_length
         self.preload_vectorizations = preload_vectorizations
+        self.sparse_vectorizations = sparse_vectorizations
+        self.preload_memmap_directory = preload_memmap_directory
         self.dataloader_workers = dataloader_workers
         self.plot_training_history_filepath = plot_training_history_filepath
+        self.mixed_precision = mixed_precision
+        self.tf32_matmul = tf32_matmul
+        self.compile_model = compile_model
+        self.compile_mode = compile_mode
+        self.compiled_model = None
+        self.distributed = distributed
+        self.score_epochs_interval = score_epochs_interval
+        self.training_model = None
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
 
     def get_model(self, n_inputs, n_outputs) -> torch.nn.Module:
         """Return a torch network that will be trained and evaluated."""
         raise NotImplementedError()
 
+    def _inference_model(self) -> torch.nn.Module:
+        """Return the network that is used for predictions, which is compiled on first use if requested."""
+        if self.model is None:
+            raise RuntimeError("can't use a model that is not yet initialized")
+        if not self.compile_model:
+            return self.model
+        if self.compiled_model is None:
+            self.compiled_model = self._compile(self.model)
+        return self.compiled_model
+
+    def _compile(self, module: torch.nn.Module) -> torch.nn.Module:
+        """Return the module compiled via `torch.compile`, which is only available for torch 2.0 or newer."""
+        if not hasattr(torch, "compile"):
+            raise ValueError(f"can not compile model, torch.compile is not available in torch {torch.__version__}")
+        return torch.compile(module, mode=self.compile_mode)
+
+    def _wrap_training_model(self) -> torch.nn.Module:
+        """Return the network that is used for training, which is distributed and compiled if requested.
+
+        The network is wrapped or compiled as a separate module that shares its parameters with the original module,
+        such that the state of the original module can still be saved and loaded as usual.
+        """
+        if not self._is_distributed():
+            return self._inference_model()
+        logger.info("train torch model distributed via %d processes", torch.distributed.get_world_size())
+        training_model = DistributedDataParallel(self.model, device_ids=[torch.device(self.device).index])
+        if self.compile_model:
+            training_model = self._compile(training_model)
+        return training_model
+
+    def _is_distributed(self) -> bool:
+        """Return whether the network is trained in multiple processes via `DistributedDataParallel`."""
+        return self.distributed and torch.distributed.is_available() and torch.distributed.is_initialized()
+
+    def _autocast(self):
+        """Return context that evaluates the network in bfloat16 if mixed precision is enabled and supported."""
+        if self.mixed_precision and self.device.startswith("cuda") and torch.cuda.is_bf16_supported():
+            return torch.autocast(device_type="cuda", dtype=torch.bfloat16)
+        return contextlib.nullcontext()
+
+    def _allow_tf32(self):
+        """Allow TensorFloat-32 for float32 matrix multiplications on cuda devices if enabled."""
+        if self.tf32_matmul and self.device.startswith("cuda"):
+            torch.set_float32_matmul_precision("high")
+            torch.backends.cudnn.allow_tf32 = True
+
     def _update_positive_class_weight(self, epoch, criterion):
         if self.positive_class_weight != 1.0 or self.positive_class_weight_decay != 1.0:
             current_weight = max(
@@ -225,13 +382,13 @@ class AbstractTorchModel(PersistableClassificationModel):
             logger.info("set positive class weight to %f", current_weight)
             criterion.pos_weight = (torch.ones([self.model_shape[1]]) * current_weight).to(self.device)
 
-    def _fit_epoch(self, epoch, train_dataloader, criterion, optimizer):
+    def _fit_epoch(self, epoch, train_dataloader, criterion, optimizer, calculate_scores=True):
         if self.model is None:
             raise RuntimeError("can't fit a model that is not yet initialized")
 
         batch = 0
         cumulative_epoch_loss = 0
-        epoch_score = TorchF1Score()
+        epoch_score = TorchF1Score() if calculate_scores else None
         progress = ProgressLogger("training", self.batch_size, epoch_score)
 
         self._update_positive_class_weight(epoch, criterion)
@@ -241,40 +398,43 @@ class AbstractTorchModel(PersistableClassificationModel):
             if isinstance(X, transformers.BatchEncoding):
                 X = X.to(self.device)
             else:
-                X = X.to(device=self.device, dtype=torch.float32)
-            y = y.to(self.device).to(torch.float32)
+                X = X.to(device=self.device, dtype=torch.float32, non_blocking=True)
+            y = y.to(device=self.device, dtype=torch.float32, non_blocking=True)
 
             # evaluate model
-            output = self.model(X)
-            loss = criterion(output, y)
+            with self._autocast():
+                output = (self.training_model or self.model)(X)
+                loss = criterion(output, y)
 
             # score predicted probabilities
-            predicted_probabilities = torch.special.expit(output)
-            epoch_score.add_batch(y, predicted_probabilities)
+            if epoch_score is not None:
+                epoch_score.add_batch(y, torch.special.expit(output))
 
             # do backpropagation
             optimizer.zero_grad()
             loss.backward()
             optimizer.step()
 
-            # remember binary cross entropy loss
-            cumulative_epoch_loss += loss.item()
+            # remember binary cross entropy loss on device, which avoids waiting for the gpu after every batch
+            cumulative_epoch_loss += loss.detach()
 
             progress.log(batch, cumulative_epoch_loss, False)
 
         progress.log(batch, cumulative_epoch_loss, True)
-        epoch_loss = cumulative_epoch_loss / (batch + 1)
+        epoch_loss = float(cumulative_epoch_loss) / (batch + 1)
 
+        if epoch_score is None:
+            return epoch_loss, np.nan, np.nan
         t01_f1, t05_f1 = epoch_score()
         return epoch_loss, t01_f1[0], t05_f1[0]
 
-    def _validate_epoch(self, validation_dataloader, criterion):
+    def _validate_epoch(self, validation_dataloader, criterion, calculate_scores=True):
         if self.model is None:
             raise RuntimeError("can't validate a model that is not yet initialized")
 
         # calculate test error on validation data
         cumulative_epoch_loss = np.nan
-        epoch_score = TorchF1Score()
+        epoch_score = TorchF1Score() if calculate_scores else None
         progress = ProgressLogger("validation", self.batch_size, epoch_score)
 
         # set model to evalution mode (not doing dropouts, etc.)
@@ -289,34 +449,54 @@ class AbstractTorchModel(PersistableClassificationModel):
                 if isinstance(X, transformers.BatchEncoding):
                     X = X.to(self.device)
                 else:
-                    X = X.to(device=self.device, dtype=torch.float32)
-                y = y.to(self.device).to(torch.float32)
+                    X = X.to(device=self.device, dtype=torch.float32, non_blocking=True)
+                y = y.to(device=self.device, dtype=torch.float32, non_blocking=True)
 
                 # evaluate model
-                output = self.model(X)
-                loss = criterion(output, y)
-                cumulative_epoch_loss += loss.item()
+                with self._autocast():
+                    output = self._inference_model()(X)
+                    loss = criterion(output, y)
+                cumulative_epoch_loss += loss.detach()
 
                 # score predicted probabilities
-                predicted_probabilities = torch.special.expit(output)
-                epoch_score.add_batch(y, predicted_probabilities)
+                if epoch_score is not None:
+                    epoch_score.add_batch(y, torch.special.expit(output))
 
                 progress.log(batch, cumulative_epoch_loss, False)
 
         progress.log(batch, cumulative_epoch_loss, True)
-        epoch_loss = cumulative_epoch_loss / (batch + 1)
+        epoch_loss = float(cumulative_epoch_loss) / (batch + 1)
 
         # reset model to training mode
         self.model.train()
 
+        if epoch_score is None:
+            return epoch_loss, np.nan, np.nan
         t01_f1, t05_f1 = epoch_score()
         return epoch_loss, t01_f1[0], t05_f1[0]
 
     def _get_data_loader_from_documents(self, documents, targets, batch_size, shuffle):
         dataset = LazyIndexedDataset(
-            self.vectorizer, documents, targets, self.max_document_length, self.preload_vectorizations
+            self.vectorizer, documents, targets, self.max_document_length, self.preload_vectorizations,
+            self.sparse_vectorizations, self.preload_memmap_directory
+        )
+        # pin batches in host memory for asynchronous transfers, and keep workers alive and busy between epochs
+        worker_options = {}
+        if self.dataloader_workers > 0:
+            worker_options = {"persistent_workers": True, "prefetch_factor": 4}
+
+        # each process only iterates over its own share of the shuffled training data
+        sampler = DistributedSampler(dataset, shuffle=True) if shuffle and self._is_distributed() else None
+
+        dataloader = DataLoader(
+            dataset,
+            batch_size=batch_size,
+            shuffle=shuffle and sampler is None,
+            sampler=sampler,
+            num_workers=self.dataloader_workers,
+            pin_memory=self.device.startswith("cuda"),
+            **worker_options,
         )
-        dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=self.dataloader_workers)
         return dataloader
 
     def _plot_score_history(self, epoch_train_score_history, epoch_validation_score_history):
@@ -339,6 +519,10 @@ class AbstractTorchModel(PersistableClassificationModel):
         """Train the fully connected network for all training documents."""
         logger.info("train torch network with %d training examples", len(train_documents))
 
+        if self._is_distributed():
+            self.device = f"cuda:{int(os.environ.get('LOCAL_RANK', 0))}"
+        self._allow_tf32()
+
         logger.debug("fit vectorizer based on training documents")
         self.vectorizer.fit(
             document_as_concatenated_string(d, max_length=self.max_document_length) for d in train_documents
@@ -376,11 +560,13 @@ class AbstractTorchModel(PersistableClassificationModel):
         self.model.to(self.device)
         self.model.train()
 
+        self.compiled_model = None
+        self.training_model = self._wrap_training_model()
+
         # define loss and optimizer
         criterion = BCEWithLogitsLoss()
         # optimizer = Adam(self.model.parameters(), lr=self.lr, weight_decay=0.0000001)
         optimizer = Adam(self.model.parameters(), lr=self.learning_rate, weight_decay=0.0)
-        scheduler = ExponentialLR(optimizer, gamma=self.learning_rate_decay)
 
         epoch_train_score_history = []
         epoch_validation_score_history = []
@@ -403,15 +589,26 @@ class AbstractTorchModel(PersistableClassificationModel):
                 logger.info("stop training due to overfitting on training data")
                 break
 
+            # shuffle training data differently in each epoch when sampling distributed
+            if isinstance(train_dataloader.sampler, DistributedSampler):
+                train_dataloader.sampler.set_epoch(epoch)
+
+            # decay learning rate exponentially, which is set in closed form instead of using a scheduler
+            if self.learning_rate_decay < 1.0:
+                for param_group in optimizer.param_groups:
+                    param_group["lr"] = self.learning_rate * self.learning_rate_decay ** epoch
+                logger.debug("adapt learning rate to %s", optimizer.param_groups[0]["lr"])
+
             # do fit for one epoch and calculate train loss and train f1_score
+            calculate_scores = epoch % self.score_epochs_interval == 0
             epoch_train_score_history.append(self._fit_epoch(
-                epoch, train_dataloader, criterion, optimizer,
+                epoch, train_dataloader, criterion, optimizer, calculate_scores
             ))
 
             # do validation and calculate loss and f1_score
             if validation_dataloader is not None:
                 epoch_validation_score_history.append(self._validate_epoch(
-                    validation_dataloader, criterion
+                    validation_dataloader, criterion, calculate_scores
                 ))
             else:
                 epoch_validation_score_history.append((np.nan, np.nan, np.nan))
@@ -421,10 +618,6 @@ class AbstractTorchModel(PersistableClassificationModel):
                 epoch, epoch_train_score_history[-1][0], *epoch_validation_score_history[-1]
             )
 
-            if self.learning_rate_decay < 1.0:
-                scheduler.step()
-                logger.debug("adapt learning rate to %s", optimizer.param_groups[0]["lr"])
-
             if time.time() - last_plot_time > 10:
                 # plot score history sometimes during training
                 self._plot_score_history(epoch_train_score_history, epoch_validation_score_history)
@@ -434,22 +627,56 @@ class AbstractTorchModel(PersistableClassificationModel):
         # definitely plot score history after training has finished
         self._plot_score_history(epoch_train_score_history, epoch_validation_score_history)
 
+    def transform_documents(self, documents: Sequence[Document]) -> Union[np.ndarray, csr_matrix, Sequence[Any]]:
+        """Transform documents to the features that are used as input to the network.
+
+        Features can be passed to `predict_proba_from_features` multiple times, such that documents that are predicted
+        repeatedly do not need to be vectorized again.
+        """
+        return _collect_features(self.vectorizer.transform(
+            document_as_concatenated_string(d, max_length=self.max_document_length) for d in documents
+        ), len(documents), self.sparse_vectorizations)
+
     def predict_proba(self, test_documents: Sequence[Document]) -> np.ndarray:
         """Predict class probabilities for all test documents."""
-        if not self.model:
+        if not self.model or self.model_shape is None:
             raise ValueError("no model trained yet")
+        return self.predict_proba_from_features(self.transform_documents(test_documents))
 
-        # transform documents to feature vectors
-        features = list(self.vectorizer.transform(
-            document_as_concatenated_string(d, max_length=self.max_document_length) for d in test_documents
-        ))
+    def predict_proba_from_features(self, features: Union[np.ndarray, csr_matrix, Sequence[Any]]) -> np.ndarray:
+        """Predict class probabilities for features as returned by `transform_documents`."""
+        if not self.model or self.model_shape is None:
+            raise ValueError("no model trained yet")
+
+        self._allow_tf32()
+        number_of_samples = features.shape[0] if isinstance(features, (np.ndarray, csr_matrix)) else len(features)
+
+        # slice dense feature matrices into large batches directly, since there are no gradients to be calculated,
+        # and only use a torch dataloader for other features (e.g. encodings) that need to be collated
+        if isinstance(features, np.ndarray):
+            features_tensor = torch.from_numpy(features)
+            dataloader = (
+                features_tensor[i:i + DENSE_PREDICTION_BATCH_SIZE]
+                for i in range(0, features_tensor.shape[0], DENSE_PREDICTION_BATCH_SIZE)
+            )
+        elif issparse(features):
+            dataloader = (
+                torch.from_numpy(features[i:i + DENSE_PREDICTION_BATCH_SIZE].toarray())
+                for i in range(0, features.shape[0], DENSE_PREDICTION_BATCH_SIZE)
+            )
+        else:
+            torch_dataset = SimpleIterableDataset(features)
+            dataloader = DataLoader(
+                torch_dataset, batch_size=self.batch_size, pin_memory=self.device.startswith("cuda")
+            )
 
-        # setup torch datatsets
-        torch_dataset = SimpleIterableDataset(features)
-        dataloader = DataLoader(torch_dataset, batch_size=self.batch_size)
+        # pre-allocate host memory for all predictions, which is pinned to allow asynchronous copies from the gpu
+        predictions = torch.empty(
+            (number_of_samples, self.model_shape[1]), dtype=torch.float32, pin_memory=self.device.startswith("cuda")
+        )
 
         # iterate over batches of all examples
-        arrays = []
+        offset = 0
         self.model.eval()
         with torch.no_grad():
             for X in dataloader:
@@ -457,17 +684,20 @@ class AbstractTorchModel(PersistableClassificationModel):
                 if isinstance(X, transformers.BatchEncoding):
                     X = X.to(self.device)
                 else:
-                    X = X.to(device=self.device, dtype=torch.float32)
+                    X = X.to(device=self.device, dtype=torch.float32, non_blocking=True)
                 # evaluate model for each test example
-                outputs = self.model(X)
+                with self._autocast():
+                    outputs = self._inference_model()(X)
                 probabilities = torch.special.expit(outputs)
-                # retrieve outputs and collected them as numpy arrays
-                arrays.append(probabilities.cpu().detach().numpy())
+                # copy probabilities into the pre-allocated host memory without waiting for the transfer
+                predictions[offset:offset + probabilities.shape[0]].copy_(probabilities, non_blocking=True)
+                offset += probabilities.shape[0]
 
-        # reverse logits and return results
-        predictions = np.vstack(arrays)
+        # wait for all asynchronous copies to finish before accessing predictions
+        if self.device.startswith("cuda"):
+            torch.cuda.synchronize()
         logger.debug("predictions shape is %s", predictions.shape)
-        return predictions
+        return predictions.numpy()
 
     def save(self, persist_dir):
         """Save torch model state to disk."""
@@ -68,6 +68,12 @@ class TorchBertModel(AbstractTorchModel):
         preload_vectorizations: bool = False,
         dataloader_workers: int = 8,
         plot_training_history_filepath: Optional[str] = None,
+        mixed_precision: bool = False,
+        tf32_matmul: bool = True,
+        compile_model: bool = False,
+        compile_mode: Optional[str] = None,
+        distributed: bool = False,
+        score_epochs_interval: int = 1,
         bert_config: Mapping[str, Any] = None,
     ):
         """Initialize BERT model."""
@@ -85,7 +91,13 @@ class TorchBertModel(AbstractTorchModel):
             max_document_length=max_document_length,
             preload_vectorizations=preload_vectorizations,
             dataloader_workers=dataloader_workers,
-            plot_training_history_filepath=plot_training_history_filepath
+            plot_training_history_filepath=plot_training_history_filepath,
+            mixed_precision=mixed_precision,
+            tf32_matmul=tf32_matmul,
+            compile_model=compile_model,
+            compile_mode=compile_mode,
+            distributed=distributed,
+            score_epochs_interval=score_epochs_interval,
         )
         self.bert_config = bert_config if bert_config is not None else {}
 
@@ -6,6 +6,7 @@ import logging
 import os
 import tempfile
 
+from itertools import islice
 from typing import List, Optional, Sequence, cast
 
 import torch
@@ -36,8 +37,12 @@ class TorchBertSequenceClassificationHeadModel(AbstractTorchModel):
     """
 
     def get_model(self, n_inputs, n_outputs):
-        """Return the sequence classification head model."""
-        return Sequential(
+        """Return the sequence classification head model.
+
+        The model is scripted via `torch.jit.script` such that the fuser can combine its element-wise operations,
+        unless it is compiled via `torch.compile` anyway, which can not compile scripted modules.
+        """
+        model = Sequential(
             # BertPooler
             Linear(n_inputs, n_inputs),
             Tanh(),
@@ -45,6 +50,9 @@ class TorchBertSequenceClassificationHeadModel(AbstractTorchModel):
             # Classifier
             Linear(n_inputs, n_outputs),
         )
+        if self.compile_model:
+            return model
+        return torch.jit.script(model)
 
 
 class _CustomTorchDataset(TorchDataset):
@@ -118,9 +126,8 @@ class HuggingfaceSequenceClassificationModel(ClassificationModel):
             )
 
     def _tokenize_documents(self, documents: Sequence[Document], max_samples: Optional[int] = None):
-        corpus = [document_as_concatenated_string(d) for d in documents]
-        if max_samples is not None:
-            corpus = corpus[:max_samples]
+        # only concatenate documents that are tokenized
+        corpus = [document_as_concatenated_string(d) for d in islice(documents, max_samples)]
         encodings = self.tokenizer(
             corpus,
             padding="max_length",
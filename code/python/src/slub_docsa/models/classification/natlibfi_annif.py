@@ -329,8 +329,7 @@ class AnnifModel(PersistableClassificationModel):
         if self.model is None or self.project is None or self.n_unique_subjects is None:
             raise RuntimeError("project and model is not available, call fit before predict!")
 
-        probabilities = np.empty((len(test_documents), self.n_unique_subjects))
-        probabilities[:, :] = np.nan
+        probabilities = np.full((len(test_documents), self.n_unique_subjects), np.nan)
 
         last_info_time = time.time()
 
@@ -14,6 +14,7 @@ from slub_docsa.common.document import Document
 from slub_docsa.common.model import PersistableClassificationModel
 from slub_docsa.data.preprocess.document import document_as_concatenated_string
 from slub_docsa.data.preprocess.vectorizer import AbstractVectorizer, PersistableVectorizerMixin
+from slub_docsa.data.store.array import vectors_as_matrix
 from slub_docsa.evaluation.classification.incidence import subject_targets_from_incidence_matrix
 
 logger = logging.getLogger(__name__)
@@ -46,8 +47,9 @@ class ScikitClassifier(PersistableClassificationModel):
         if not self.vectorizer:
             raise RuntimeError("Vectorizer not initialized, execute fit before predict!")
 
-        features = list(self.vectorizer.transform(document_as_concatenated_string(d) for d in documents))
-        features = np.array(features)
+        features = vectors_as_matrix(
+            self.vectorizer.transform(document_as_concatenated_string(d) for d in documents), len(documents)
+        )
 
         # NaiveBayes classifier requires features as full-size numpy matrix
         # if isinstance(features, csr_matrix) and hasattr(self.predictor, "estimator") \
@@ -85,11 +87,11 @@ class ScikitClassifier(PersistableClassificationModel):
         started = time.time() * 1000
         probability_list = self.predictor.predict_proba(features)
         logger.debug("scikit predict_proba took %d ms", ((time.time() * 1000) - started))
+        # stack as (documents, subjects) directly, such that rows are contiguous in memory for scoring
         if len(probability_list[0].shape) > 1:
-            probability_matrix = np.stack(list(map(lambda p: p[:, -1], probability_list)), axis=0)
+            probability_matrix = np.stack([p[:, -1] for p in probability_list], axis=1)
         else:
-            probability_matrix = np.stack(probability_list, axis=1)
-        probability_matrix = np.transpose(probability_matrix)
+            probability_matrix = np.stack(probability_list, axis=0)
         return probability_matrix
 
     def save(self, persist_dir):
@@ -4,12 +4,11 @@ import logging
 
 from typing import Any, Sequence
 
-import numpy as np
-
 from slub_docsa.common.document import Document
 from slub_docsa.common.model import ClusteringModel
 from slub_docsa.data.preprocess.document import document_as_concatenated_string
 from slub_docsa.data.preprocess.vectorizer import AbstractVectorizer
+from slub_docsa.data.store.array import vectors_as_matrix
 from slub_docsa.evaluation.clustering.membership import crips_cluster_assignments_to_membership_matrix
 
 logger = logging.getLogger(__name__)
@@ -36,7 +35,9 @@ class ScikitClusteringModel(ClusteringModel):
         if hasattr(self.model, "predict"):
             # if algorithm has a separate predict function, it makes sense to learn a model first
             self.vectorizer.fit(document_as_concatenated_string(d) for d in documents)
-            features = np.array(list(self.vectorizer.transform(document_as_concatenated_string(d) for d in documents)))
+            features = vectors_as_matrix(
+                self.vectorizer.transform(document_as_concatenated_string(d) for d in documents), len(documents)
+            )
             logger.debug("run fit on scikit clustering with features %s", features.shape)
             self.model.fit(features)
             logger.debug("done fitting scikit clustering")
@@ -45,7 +46,9 @@ class ScikitClusteringModel(ClusteringModel):
 
     def predict(self, documents: Sequence[Document]):
         """Predict cluster membership matrix by randomly assigning documents."""
-        features = np.array(list(self.vectorizer.transform(document_as_concatenated_string(d) for d in documents)))
+        features = vectors_as_matrix(
+            self.vectorizer.transform(document_as_concatenated_string(d) for d in documents), len(documents)
+        )
 
         # assume crisp clustering
         if hasattr(self.model, "predict"):
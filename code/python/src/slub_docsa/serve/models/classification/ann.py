@@ -2,6 +2,8 @@
 
 import os
 
+from typing import Optional
+
 from slub_docsa.common.paths import get_figures_dir
 from slub_docsa.data.preprocess.vectorizer import GensimTfidfVectorizer, StemmingVectorizer
 from slub_docsa.experiments.common.vectorizer import get_static_wikipedia_wordpiece_vectorizer
@@ -10,8 +12,20 @@ from slub_docsa.models.classification.ann.dense import TorchSingleLayerDenseRelu
 from slub_docsa.serve.common import ModelTypeMapping
 
 
-def get_ann_classification_models_map() -> ModelTypeMapping:
-    """Return a map of classification model types and their generator functions."""
+def get_ann_classification_models_map(stemming_cache_dir: Optional[str] = None) -> ModelTypeMapping:
+    """Return a map of classification model types and their generator functions.
+
+    Parameters
+    ----------
+    stemming_cache_dir: Optional[str] = None
+        the directory in which stemmed texts are persisted, see
+        `slub_docsa.serve.models.classification.classic.get_classic_classification_models_map`
+
+    Returns
+    -------
+    ModelTypeMapping
+        the map of classification model types and their generator functions
+    """
     models = {}
     for lang_code in ["de", "en"]:
         models.update({
@@ -26,6 +40,9 @@ def get_ann_classification_models_map() -> ModelTypeMapping:
                     vectorizer=StemmingVectorizer(
                         vectorizer=GensimTfidfVectorizer(max_features=10000),
                         lang_code=lc,
+                        stemming_cache_filepath=os.path.join(
+                            stemming_cache_dir, f"{lc}.sqlite"
+                        ) if stemming_cache_dir else None,
                     ),
                     preload_vectorizations=False,
                     dataloader_workers=8,
@@ -1,5 +1,9 @@
 """Setup classic classification models."""
 
+import os
+
+from typing import Optional
+
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
 from sklearn.multioutput import MultiOutputClassifier
@@ -14,10 +18,27 @@ from slub_docsa.models.classification.scikit import ScikitClassifier
 from slub_docsa.serve.common import ModelTypeMapping
 
 
-def get_classic_classification_models_map() -> ModelTypeMapping:
-    """Return a map of classification model types and their generator functions."""
+def get_classic_classification_models_map(stemming_cache_dir: Optional[str] = None) -> ModelTypeMapping:
+    """Return a map of classification model types and their generator functions.
+
+    Parameters
+    ----------
+    stemming_cache_dir: Optional[str] = None
+        the directory in which stemmed texts are persisted, such that models sharing a stemming vectorizer only stem
+        the same texts once (e.g. when publishing multiple models); if None, stemmed texts are not persisted, which
+        should be the case when classifying arbitrary texts via the REST service
+
+    Returns
+    -------
+    ModelTypeMapping
+        the map of classification model types and their generator functions
+    """
     def get_tfidf_stemming_vectorizer_de():
-        return StemmingVectorizer(vectorizer=GensimTfidfVectorizer(max_features=10000), lang_code="de")
+        return StemmingVectorizer(
+            vectorizer=GensimTfidfVectorizer(max_features=10000),
+            lang_code="de",
+            stemming_cache_filepath=os.path.join(stemming_cache_dir, "de.sqlite") if stemming_cache_dir else None,
+        )
 
     return {
         "tfidf_10k_knn_k=1": lambda subject_hierarchy, subject_order: ScikitClassifier(
@@ -1,12 +1,14 @@
 """All model types."""
 
+from typing import Optional
+
 from slub_docsa.serve.models.classification.ann import get_ann_classification_models_map
 from slub_docsa.serve.models.classification.classic import get_classic_classification_models_map
 from slub_docsa.serve.models.classification.dbmdz import get_dbmdz_classification_models_map
 from slub_docsa.serve.models.classification.natlibfi_annif import get_annif_classification_models_map
 
 
-def get_all_classification_model_types():
+def get_all_classification_model_types(stemming_cache_dir: Optional[str] = None):
     """Return all available model types.
 
     Model types include:
@@ -15,10 +17,13 @@ def get_all_classification_model_types():
     - models based on artificial neural networks, see `slub_docsa.serve.models.classification.ann`
     - models using the pre-trained Dbmdz BERT transformer for vectorization, see
       `slub_docsa.serve.models.classification.dbmdz`
+
+    Stemmed texts are only persisted in `stemming_cache_dir` if it is given, which should not be the case when
+    classifying arbitrary texts via the REST service.
     """
     model_types = {}
-    model_types.update(get_classic_classification_models_map())
+    model_types.update(get_classic_classification_models_map(stemming_cache_dir))
     model_types.update(get_annif_classification_models_map())
-    model_types.update(get_ann_classification_models_map())
+    model_types.update(get_ann_classification_models_map(stemming_cache_dir))
     model_types.update(get_dbmdz_classification_models_map())
     return model_types
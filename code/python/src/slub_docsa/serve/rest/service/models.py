@@ -203,6 +203,15 @@ def classify_with_limit_and_threshold(
     """Perform classification and compile results using certain limit and threshold."""
     # do actual classification
     probabilities = model.predict_proba(documents)
+    return limit_and_threshold_probabilities(probabilities, limit, threshold)
+
+
+def limit_and_threshold_probabilities(
+    probabilities: np.ndarray,
+    limit: int = 10,
+    threshold: float = 0.0
+) -> Sequence[Sequence[Tuple[float, int]]]:
+    """Compile classification results from already predicted probabilities using certain limit and threshold."""
     limit = min(probabilities.shape[1], limit)
     if limit < probabilities.shape[1]:
         # find best results
@@ -0,0 +1,69 @@
+"""Test document preprocessing methods."""
+
+import os
+import tempfile
+
+import pytest
+import Stemmer
+
+from slub_docsa.common.document import Document
+from slub_docsa.data.preprocess.document import document_as_concatenated_string
+from slub_docsa.data.preprocess.document import nltk_snowball_text_stemming_function
+from slub_docsa.data.preprocess.document import persisted_nltk_snowball_text_stemming_function
+
+GERMAN_TEXT = "die Häuser und die Bücher der Universitäten laufen schnell"
+
+
+def test_document_as_concatenated_string_with_max_length():
+    """Check that truncated concatenated strings match the prefix of the full concatenated string."""
+    document = Document(
+        uri="uri://test", title="A title", authors=["First Author", "Second Author"], abstract="The abstract",
+        toc=None, fulltext="A long fulltext " * 10
+    )
+    full_text = document_as_concatenated_string(document)
+
+    assert full_text == "A title\nFirst Author, Second Author\nThe abstract\n" + "A long fulltext " * 10
+    for max_length in [0, 5, 7, 8, 20, 40, 100, 1000]:
+        assert document_as_concatenated_string(document, max_length=max_length) == full_text[:max_length]
+    assert document_as_concatenated_string(document, skip_title=True, skip_fulltext=True, max_length=30) == \
+        "\nFirst Author, Second Author\nThe abstract"[:30]
+
+
+def _stemming_function_or_skip(stemming_function_generator):
+    """Return stemming function, or skip the test if nltk resources can not be downloaded (e.g. when offline)."""
+    try:
+        stemming = stemming_function_generator()
+        stemming("test")
+    except LookupError:
+        pytest.skip("nltk tokenizer or stopwords are not available")
+    return stemming
+
+
+def test_pystemmer_german_stems():
+    """Check German stems of the snowball stemmer provided by PyStemmer, which does not require nltk resources."""
+    stemmer = Stemmer.Stemmer("german")
+    words = ["häuser", "bücher", "universitäten", "laufen", "straße", "möglichkeiten", "lehrerinnen"]
+    # the stem of "lehrerinnen" differs from the stem "lehrerinn" of the older snowball release included in nltk
+    assert stemmer.stemWords(words) == ["haus", "buch", "universitat", "lauf", "strass", "moglich", "lehr"]
+
+
+def test_snowball_stemming_of_german_words():
+    """Check that German words are stemmed and stopwords are removed."""
+    stemming = _stemming_function_or_skip(lambda: nltk_snowball_text_stemming_function("de", remove_stopwords=True))
+    assert stemming(GERMAN_TEXT) == "haus buch universitat lauf schnell"
+
+
+def test_snowball_stemming_of_german_words_without_stopword_removal():
+    """Check that stopwords are kept and stemmed as well if stopword removal is disabled."""
+    stemming = _stemming_function_or_skip(lambda: nltk_snowball_text_stemming_function("de", remove_stopwords=False))
+    assert stemming(GERMAN_TEXT) == "die haus und die buch der universitat lauf schnell"
+
+
+def test_persisted_snowball_stemming_equals_stemming():
+    """Check that persisted stemmed texts equal the stemmed texts, also when loaded from the cache."""
+    with tempfile.TemporaryDirectory() as directory:
+        stemming = _stemming_function_or_skip(lambda: persisted_nltk_snowball_text_stemming_function(
+            os.path.join(directory, "stemming.sqlite"), "de", remove_stopwords=True
+        ))
+        assert stemming(GERMAN_TEXT) == "haus buch universitat lauf schnell"
+        assert stemming(GERMAN_TEXT) == "haus buch universitat lauf schnell"
@@ -0,0 +1,170 @@
+"""Test vectorizer methods."""
+
+import os
+import sqlite3
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+
+from slub_docsa.data.preprocess.vectorizer import HuggingfaceBertVectorizer
+from slub_docsa.data.preprocess.vectorizer import PersistedCachedVectorizer, ScikitTfidfVectorizer
+from slub_docsa.data.preprocess.vectorizer import _extract_subtext_samples
+
+
+def _example_texts():
+    return ["This is a test", "A test indeed", "Another sentence without common words", "A test indeed"]
+
+
+def test_persisted_cached_vectorizer_returns_same_vectors_as_parent():
+    """Check that persisted cached vectorizer returns the same vectors when loading from cache."""
+    texts = _example_texts()
+    parent_vectorizer = ScikitTfidfVectorizer()
+    parent_vectorizer.fit(iter(texts))
+    expected = np.array(list(parent_vectorizer.transform(iter(texts[:3]))))
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "vectorizations.sqlite")
+        vectorizer = PersistedCachedVectorizer(filepath, parent_vectorizer, batch_size=2)
+
+        uncached = np.array(list(vectorizer.transform(iter(texts))))
+        cached = np.array(list(vectorizer.transform(iter(texts))))
+
+        assert np.allclose(uncached[:3], expected)
+        assert np.allclose(uncached[3], uncached[1])
+        assert np.allclose(cached, uncached)
+        vectorizer.close()
+
+
+def test_persisted_cached_vectorizer_rolls_back_failed_writes():
+    """Check that a failed write is rolled back, such that later vectorizations can still be stored."""
+    # pylint: disable=protected-access
+    texts = _example_texts()
+    parent_vectorizer = ScikitTfidfVectorizer()
+    parent_vectorizer.fit(iter(texts))
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "vectorizations.sqlite")
+        vectorizer = PersistedCachedVectorizer(filepath, parent_vectorizer)
+
+        with pytest.raises(sqlite3.Error):
+            vectorizer._store_vectorizations([("a", b"valid"), ("b", object())])
+        assert not vectorizer.connection.in_transaction
+        assert not vectorizer._load_cached_vectorizations(["a"])
+
+        vectors = np.array(list(vectorizer.transform(iter(texts))))
+        stored = vectorizer.connection.execute(f"SELECT COUNT(*) FROM \"{vectorizer.table_name}\"").fetchone()[0]
+        assert stored == len(set(texts))
+        assert np.allclose(vectors, np.array(list(parent_vectorizer.transform(iter(texts)))))
+        vectorizer.close()
+
+
+def test_persisted_cached_vectorizer_shared_between_threads():
+    """Check that multiple threads can concurrently load and store vectorizations via the same vectorizer."""
+    texts = [f"text number {i}" for i in range(200)]
+    parent_vectorizer = ScikitTfidfVectorizer()
+    parent_vectorizer.fit(iter(texts))
+    expected = np.array(list(parent_vectorizer.transform(iter(texts))))
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "vectorizations.sqlite")
+        vectorizer = PersistedCachedVectorizer(filepath, parent_vectorizer, batch_size=10)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(lambda _: np.array(list(vectorizer.transform(iter(texts)))), range(8)))
+
+        for result in results:
+            assert np.allclose(result, expected)
+        vectorizer.close()
+
+
+def test_extract_subtext_samples_starts_at_word_boundaries():
+    """Check that subtexts start at the beginning of a word, also if the text starts with a space."""
+    # pylint: disable=protected-access
+    assert list(_extract_subtext_samples("one two three four", 2)) == ["one two three four", "three four"]
+    assert list(_extract_subtext_samples(" one two three", 2)) == ["one two three", "two three"]
+    assert list(_extract_subtext_samples("onetwothree", 3)) == ["onetwothree"] * 3
+
+
+def test_persisted_cached_vectorizer_quantization():
+    """Check that quantized vectorizations approximately match the vectors of the parent vectorizer."""
+    texts = _example_texts()
+    parent_vectorizer = ScikitTfidfVectorizer()
+    parent_vectorizer.fit(iter(texts))
+    expected = np.array(list(parent_vectorizer.transform(iter(texts))))
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, "vectorizations.sqlite")
+        for quantization, tolerance in [("fp16", 1e-3), ("int8", 1e-2)]:
+            vectorizer = PersistedCachedVectorizer(filepath, parent_vectorizer, quantization=quantization)
+            uncached = np.array(list(vectorizer.transform(iter(texts))))
+            cached = np.array(list(vectorizer.transform(iter(texts))))
+
+            assert cached.dtype == np.float32
+            assert np.allclose(uncached, expected, atol=tolerance)
+            assert np.array_equal(cached, uncached)
+
+
+class _StubBertTokenizer:  # pylint: disable=too-few-public-methods
+    """Word-level tokenizer that pads to the longest text of a batch similar to a Huggingface tokenizer."""
+
+    pad_token_id = 0
+
+    def __call__(self, texts, padding=True, truncation=True, return_tensors="pt"):
+        """Return input ids and attention mask of all texts padded to the longest text."""
+        token_ids = [([1] + [sum(map(ord, word)) % 60 + 2 for word in text.split()])[:6] for text in texts]
+        max_length = max(len(ids) for ids in token_ids)
+        input_ids = torch.zeros((len(texts), max_length), dtype=torch.long)
+        attention_mask = torch.zeros((len(texts), max_length), dtype=torch.long)
+        for i, ids in enumerate(token_ids):
+            input_ids[i, :len(ids)] = torch.tensor(ids)
+            attention_mask[i, :len(ids)] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+class _StubBertModel(torch.nn.Module):
+    """Model whose hidden states depend on all tokens of a text, but not on the padding."""
+
+    def __init__(self):
+        """Initialize random token embeddings."""
+        super().__init__()
+        torch.manual_seed(0)
+        self.embedding = torch.nn.Embedding(64, 4)
+
+    def forward(self, input_ids, attention_mask):
+        """Return the masked token embeddings plus the sum of all token embeddings of a text."""
+        embeddings = self.embedding(input_ids) * attention_mask[..., None]
+        return SimpleNamespace(last_hidden_state=embeddings + embeddings.sum(dim=1, keepdim=True))
+
+
+def _stub_bert_vectorizer(model, **kwargs):
+    vectorizer = HuggingfaceBertVectorizer(hidden_states=2, **kwargs)
+    vectorizer.tokenizer = _StubBertTokenizer()
+    vectorizer.model = model
+    return vectorizer
+
+
+def test_huggingface_bert_vectorizer_with_cached_padded_and_deduplicated_batches():
+    """Check that cached, re-padded and deduplicated batches give the same vectors as vectorizing each text alone."""
+    texts = [
+        "a short text", "a much longer text with many more words than the others", "two words", "a short text",
+        "two words", "yet another text", "a short text", "two words", "one", "a much longer text with many more",
+    ]
+    model = _StubBertModel()
+
+    # vectorize each text alone, such that there is neither padding, caching nor deduplication
+    with torch.no_grad():
+        expected = np.array([
+            model(**_StubBertTokenizer()([text])).last_hidden_state[0, :2, :].numpy().reshape(-1) for text in texts
+        ])
+
+    for batch_size, tokenizer_cache_size in [(1, 0), (3, 0), (3, 2), (4, 10000)]:
+        vectorizer = _stub_bert_vectorizer(model, batch_size=batch_size, tokenizer_cache_size=tokenizer_cache_size)
+        for _ in range(2):
+            vectors = np.array(list(vectorizer.transform(iter(texts))))
+            assert len(vectorizer.tokenizer_cache) <= tokenizer_cache_size
+            assert np.allclose(vectors, expected, atol=1e-6)
@@ -0,0 +1,48 @@
+"""Test helper methods to store numpy arrays."""
+
+import tempfile
+
+import numpy as np
+import pytest
+
+from slub_docsa.data.store.array import vectors_as_matrix
+
+
+def _random_vectors(number_of_vectors, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.random(5) for _ in range(number_of_vectors)]
+
+
+def test_vectors_as_matrix_equals_numpy_array():
+    """Check that vectors collected in a pre-allocated matrix equal the matrix created from a list of vectors."""
+    vectors = _random_vectors(10)
+    expected = np.array(vectors)
+
+    matrix = vectors_as_matrix(iter(vectors), len(vectors))
+
+    assert matrix.dtype == expected.dtype
+    assert np.array_equal(matrix, expected)
+
+
+def test_vectors_as_matrix_with_dtype_and_memmap():
+    """Check that vectors can be collected in a memory-mapped matrix of a different dtype."""
+    vectors = _random_vectors(10, seed=1)
+
+    with tempfile.TemporaryDirectory() as directory:
+        matrix = vectors_as_matrix(iter(vectors), len(vectors), np.float32, directory)
+
+        assert isinstance(matrix, np.memmap)
+        assert matrix.dtype == np.float32
+        assert np.allclose(matrix, np.array(vectors))
+
+
+def test_vectors_as_matrix_checks_number_of_vectors():
+    """Check that a clear error is raised if the number of vectors does not match the expected number."""
+    vectors = [np.ones(3), np.zeros(3)]
+
+    for number_of_vectors in [0, 1, 3]:
+        with pytest.raises(ValueError):
+            vectors_as_matrix(iter(vectors), number_of_vectors)
+    with pytest.raises(ValueError):
+        vectors_as_matrix(iter([]), 2)
+    assert vectors_as_matrix(iter([]), 0).shape == (0,)
@@ -6,6 +6,7 @@ import pytest
 from slub_docsa.evaluation.classification.incidence import subject_incidence_matrix_from_targets
 from slub_docsa.evaluation.classification.incidence import subject_targets_from_incidence_matrix
 from slub_docsa.evaluation.classification.incidence import ThresholdIncidenceDecision, TopkIncidenceDecision
+from slub_docsa.evaluation.classification.incidence import CachedIncidenceDecision
 
 example_subject_order = [
     "uri://subject1",
@@ -101,3 +102,19 @@ def test_top_k_incidence_decision():
 
     assert np.array_equal(incidence_top1, TopkIncidenceDecision(1)(probabilities))
     assert np.array_equal(incidence_top2, TopkIncidenceDecision(2)(probabilities))
+
+
+def test_cached_incidence_decision_remembers_recent_probabilities():
+    """Check that the cached incidence decision only re-applies the decision to new probability matrices."""
+    true_probabilities = np.array([[1.0, 0.0], [0.0, 1.0]])
+    predicted_probabilities = np.array([[0.7, 0.2], [0.4, 0.6]])
+
+    decision = CachedIncidenceDecision(ThresholdIncidenceDecision(0.5))
+    true_incidence = decision(true_probabilities)
+    predicted_incidence = decision(predicted_probabilities)
+
+    assert decision(true_probabilities) is true_incidence
+    assert decision(predicted_probabilities) is predicted_incidence
+    assert np.array_equal(predicted_incidence, [[1, 0], [0, 1]])
+    assert decision(predicted_probabilities.copy()) is not predicted_incidence
+    assert str(decision) == str(ThresholdIncidenceDecision(0.5))
@@ -0,0 +1,61 @@
+"""Test classification evaluation pipeline."""
+
+import numpy as np
+
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.neural_network import MLPClassifier
+
+from slub_docsa.data.artificial.simple import get_static_mini_dataset
+from slub_docsa.data.preprocess.vectorizer import ScikitTfidfVectorizer
+from slub_docsa.evaluation.classification.incidence import unique_subject_order
+from slub_docsa.evaluation.classification.pipeline import score_classification_models_for_dataset
+from slub_docsa.evaluation.classification.score.batched import BatchedF1Score, BatchedBestThresholdScore
+from slub_docsa.evaluation.classification.score.batched import BatchedNumberOfTestExamplesPerClass
+from slub_docsa.models.classification.dummy import NihilisticModel, OptimisticModel, OracleModel
+from slub_docsa.models.classification.scikit import ScikitClassifier
+
+
+def test_score_classification_models_for_dataset_in_parallel():
+    """Check that evaluating models concurrently returns the same scores in the same order of models."""
+    dataset = get_static_mini_dataset()
+    subject_order = unique_subject_order(dataset.subjects)
+    model_generators = [OracleModel, NihilisticModel, OptimisticModel]
+    score_generators = [lambda: BatchedBestThresholdScore(BatchedF1Score)]
+    per_class_score_generators = [BatchedNumberOfTestExamplesPerClass]
+
+    sequential_scores, sequential_per_class_scores = score_classification_models_for_dataset(
+        subject_order, dataset, dataset, None, model_generators, score_generators, per_class_score_generators
+    )
+    parallel_scores, parallel_per_class_scores = score_classification_models_for_dataset(
+        subject_order, dataset, dataset, None, model_generators, score_generators, per_class_score_generators,
+        n_jobs=3,
+    )
+
+    assert np.allclose(parallel_scores, sequential_scores)
+    assert np.array_equal(parallel_per_class_scores, sequential_per_class_scores)
+    assert sequential_scores[0][0] > 0.99
+    assert sequential_scores[1][0] < 0.01
+
+
+def test_score_fitted_models_for_dataset_with_two_jobs():
+    """Check that two concurrently fitted models without shared state match the scores of a sequential run."""
+    dataset = get_static_mini_dataset()
+    subject_order = unique_subject_order(dataset.subjects)
+    model_generators = [
+        lambda: ScikitClassifier(predictor=KNeighborsClassifier(n_neighbors=1), vectorizer=ScikitTfidfVectorizer()),
+        lambda: ScikitClassifier(predictor=MLPClassifier(random_state=0), vectorizer=ScikitTfidfVectorizer()),
+        OracleModel,
+    ]
+    score_generators = [lambda: BatchedBestThresholdScore(BatchedF1Score)]
+    per_class_score_generators = [BatchedNumberOfTestExamplesPerClass]
+
+    sequential_scores, sequential_per_class_scores = score_classification_models_for_dataset(
+        subject_order, dataset, dataset, None, model_generators, score_generators, per_class_score_generators
+    )
+    parallel_scores, parallel_per_class_scores = score_classification_models_for_dataset(
+        subject_order, dataset, dataset, None, model_generators, score_generators, per_class_score_generators,
+        n_jobs=2,
+    )
+
+    assert np.allclose(parallel_scores, sequential_scores)
+    assert np.array_equal(parallel_per_class_scores, sequential_per_class_scores)
@@ -0,0 +1,149 @@
+"""Test batched score functions."""
+
+import numpy as np
+
+from slub_docsa.evaluation.classification.score.batched import BatchedBestThresholdScore, BatchedConfusionScore
+from slub_docsa.evaluation.classification.score.batched import BatchedAccuracyScore, BatchedF1Score
+from slub_docsa.evaluation.classification.score.batched import BatchedPerClassF1Score, BatchedPrecisionScore
+from slub_docsa.evaluation.classification.score.batched import BatchedIncidenceDecisionScore
+from slub_docsa.evaluation.classification.score.batched import BatchedNumberOfTestExamplesPerClass
+from slub_docsa.evaluation.classification.incidence import ThresholdIncidenceDecision
+
+
+def _random_incidences(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    true_incidences = (rng.random(shape) > 0.7).astype(np.uint8)
+    predicted_incidences = (rng.random(shape) > 0.6).astype(np.uint8)
+    return true_incidences, predicted_incidences
+
+
+def test_batched_confusion_score_counts():
+    """Check that confusion counts collected over multiple batches match counts of the full incidence matrices."""
+    true_incidences, predicted_incidences = _random_incidences((50, 20))
+
+    score = BatchedConfusionScore()
+    score.add_batch(true_incidences[:30], predicted_incidences[:30])
+    score.add_batch(true_incidences[30:], predicted_incidences[30:])
+
+    assert score.true_positive == (true_incidences * predicted_incidences).sum()
+    assert score.false_positive == ((1 - true_incidences) * predicted_incidences).sum()
+    assert score.false_negative == (true_incidences * (1 - predicted_incidences)).sum()
+
+
+def test_batched_per_class_confusion_score_counts():
+    """Check that per-class confusion counts collected over multiple batches match counts of the full matrices."""
+    true_incidences, predicted_incidences = _random_incidences((50, 20))
+
+    score = BatchedPerClassF1Score()
+    score.add_batch(true_incidences[:30], predicted_incidences[:30])
+    score.add_batch(true_incidences[30:], predicted_incidences[30:])
+
+    assert np.array_equal(score.true_positive, (true_incidences * predicted_incidences).sum(axis=0))
+    assert np.array_equal(score.false_positive, ((1 - true_incidences) * predicted_incidences).sum(axis=0))
+    assert np.array_equal(score.false_negative, (true_incidences * (1 - predicted_incidences)).sum(axis=0))
+    assert score.true_positive.dtype == np.int64
+
+
+def test_batched_per_class_confusion_score_counts_independent_of_incidence_dtype():
+    """Check that uint8 incidences (optionally counted via numba) give the same counts as float incidences."""
+    true_incidences, predicted_incidences = _random_incidences((50, 20), seed=2)
+
+    uint8_score = BatchedPerClassF1Score()
+    uint8_score.add_batch(true_incidences, predicted_incidences)
+    float_score = BatchedPerClassF1Score()
+    float_score.add_batch(true_incidences.astype(float), predicted_incidences.astype(float))
+
+    assert np.array_equal(uint8_score.true_positive, float_score.true_positive)
+    assert np.array_equal(uint8_score.false_positive, float_score.false_positive)
+    assert np.array_equal(uint8_score.false_negative, float_score.false_negative)
+
+
+def test_batched_best_threshold_score_pairs_optimizer_and_score_by_threshold():
+    """Check that each threshold only contributes to its own optimizer and score."""
+    true_probabilities = np.array([[1, 0, 1], [0, 1, 0]], dtype=np.uint8)
+    predicted_probabilities = np.array([[0.9, 0.05, 0.35], [0.15, 0.55, 0.0]])
+
+    score = BatchedBestThresholdScore(BatchedF1Score, thresholds=[0.1, 0.3, 0.5])
+    score.add_batch(true_probabilities, predicted_probabilities)
+
+    assert [s.true_positive for s in score.scores] == [3, 3, 2]
+    assert [s.false_positive for s in score.scores] == [1, 0, 0]
+    assert [s.false_negative for s in score.scores] == [0, 0, 1]
+    assert score() == score.scores[1]()
+
+
+def test_batched_best_threshold_score_equals_score_of_individual_thresholds():
+    """Check that broadcasting all thresholds at once gives the same scores as scoring each threshold separately."""
+    rng = np.random.default_rng(0)
+    true_probabilities = (rng.random((40, 15)) > 0.7).astype(np.uint8)
+    predicted_probabilities = rng.random((40, 15))
+    thresholds = [0.2, 0.4, 0.6, 0.8]
+
+    score = BatchedBestThresholdScore(BatchedPrecisionScore, thresholds=thresholds)
+    score.add_batch(true_probabilities[:25], predicted_probabilities[:25])
+    score.add_batch(true_probabilities[25:], predicted_probabilities[25:])
+
+    for i, threshold in enumerate(thresholds):
+        expected = BatchedPrecisionScore()
+        expected.add_batch(true_probabilities, (predicted_probabilities >= threshold).astype(np.uint8))
+        assert score.scores[i]() == expected()
+
+
+def test_batched_best_threshold_score_with_non_confusion_score():
+    """Check that re-using incidence buffers across thresholds and batches gives the same scores."""
+    rng = np.random.default_rng(1)
+    true_probabilities = (rng.random((40, 15)) > 0.7).astype(np.uint8)
+    predicted_probabilities = rng.random((40, 15))
+    thresholds = [0.2, 0.5, 0.8]
+
+    score = BatchedBestThresholdScore(BatchedAccuracyScore, thresholds=thresholds)
+    score.add_batch(true_probabilities[:25], predicted_probabilities[:25])
+    score.add_batch(true_probabilities[25:], predicted_probabilities[25:])
+
+    for i, threshold in enumerate(thresholds):
+        expected = BatchedAccuracyScore()
+        expected.add_batch(true_probabilities, (predicted_probabilities >= threshold).astype(np.uint8))
+        assert score.scores[i]() == expected()
+
+
+def test_batched_incidence_decision_score_with_batches_of_different_size():
+    """Check that re-using threshold incidence buffers for batches of different size gives the same score."""
+    rng = np.random.default_rng(3)
+    true_probabilities = (rng.random((40, 15)) > 0.7).astype(np.uint8)
+    predicted_probabilities = rng.random((40, 15))
+
+    score = BatchedIncidenceDecisionScore(ThresholdIncidenceDecision(0.5), BatchedF1Score())
+    for start, end in [(0, 15), (15, 30), (30, 40)]:
+        score.add_batch(true_probabilities[start:end], predicted_probabilities[start:end])
+
+    expected = BatchedF1Score()
+    expected.add_batch(true_probabilities, (predicted_probabilities >= 0.5).astype(np.uint8))
+    assert score() == expected()
+
+
+def test_batched_best_threshold_score_with_binary_true_probabilities():
+    """Check that determining binary true incidences only once gives the same scores as thresholding them."""
+    rng = np.random.default_rng(4)
+    true_probabilities = (rng.random((40, 15)) > 0.7).astype(np.uint8)
+    predicted_probabilities = rng.random((40, 15))
+
+    for score_generator in (BatchedF1Score, BatchedAccuracyScore):
+        binary_score = BatchedBestThresholdScore(score_generator, true_is_binary=True)
+        thresholded_score = BatchedBestThresholdScore(score_generator, true_is_binary=False)
+        for score in (binary_score, thresholded_score):
+            score.add_batch(true_probabilities[:25], predicted_probabilities[:25])
+            score.add_batch(true_probabilities[25:], predicted_probabilities[25:])
+
+        assert [s() for s in binary_score.scores] == [s() for s in thresholded_score.scores]
+
+
+def test_batched_number_of_test_examples_per_class_counts_integers():
+    """Check that the number of test examples is counted as integers over multiple batches."""
+    true_incidences, predicted_incidences = _random_incidences((50, 20), seed=5)
+
+    score = BatchedNumberOfTestExamplesPerClass()
+    score.add_batch(true_incidences[:30], predicted_incidences[:30])
+    score.add_batch(true_incidences[30:], predicted_incidences[30:])
+
+    assert np.array_equal(score(), true_incidences.sum(axis=0))
+    assert score().dtype == np.int64
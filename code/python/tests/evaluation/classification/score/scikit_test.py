@@ -0,0 +1,22 @@
+"""Test scikit based score functions."""
+
+import numpy as np
+from sklearn.metrics import f1_score
+
+from slub_docsa.evaluation.classification.score.scikit import _micro_f1_scores_for_thresholds
+
+
+def test_micro_f1_scores_for_thresholds_match_scikit_f1_score():
+    """Check that f1 scores calculated from sorted probabilities match scikit's f1 score for every threshold."""
+    # pylint: disable=protected-access
+    rng = np.random.default_rng(0)
+    true_incidence = (rng.random((40, 15)) > 0.7).astype(np.uint8)
+    predicted_probabilities = np.round(rng.random((40, 15)), 1).astype(np.float32)
+    thresholds = [i / 10.0 + 0.1 for i in range(9)] + [2.0]
+
+    scores = _micro_f1_scores_for_thresholds(true_incidence, predicted_probabilities, thresholds)
+
+    for threshold, score in zip(thresholds, scores):
+        predicted_incidence = (predicted_probabilities >= threshold).astype(np.uint8)
+        expected = f1_score(true_incidence, predicted_incidence, average="micro", zero_division=0)
+        assert np.isclose(score, expected)
@@ -1,8 +1,13 @@
 """Tests for ANN models based on torch."""
 
+import tempfile
+
+import pytest
+
 from slub_docsa.data.preprocess.vectorizer import ScikitTfidfVectorizer, WordpieceVectorizer
 from slub_docsa.models.classification.ann.bert import TorchBertModel
 from slub_docsa.models.classification.ann.dense import TorchSingleLayerDenseTanhModel
+from slub_docsa.models.classification.ann.pretrained import TorchBertSequenceClassificationHeadModel
 
 from .common import check_model_persistence_equal_predictions, check_model_predicts_non_zero_probabilities
 
@@ -21,6 +26,43 @@ def test_simple_ann_torch_persistence():
     )
 
 
+def test_scripted_bert_sequence_classification_head_persistence():
+    """Check that predictions of the scripted Bert classification head model are the same after persistence."""
+    check_model_persistence_equal_predictions(
+        lambda: TorchBertSequenceClassificationHeadModel(
+            vectorizer=ScikitTfidfVectorizer(max_features=100), max_epochs=5
+        )
+    )
+
+
+def test_simple_ann_torch_model_with_sparse_vectorizations():
+    """Test fitting and predicting with a basic torch model that stores tfidf vectors as sparse matrix."""
+    check_model_predicts_non_zero_probabilities(
+        TorchSingleLayerDenseTanhModel(
+            vectorizer=ScikitTfidfVectorizer(max_features=100), max_epochs=5, sparse_vectorizations=True
+        )
+    )
+
+
+def test_simple_ann_torch_model_with_memmap_vectorizations():
+    """Test fitting and predicting with a basic torch model that stores preloaded vectors in a memory-mapped file."""
+    with tempfile.TemporaryDirectory() as directory:
+        check_model_predicts_non_zero_probabilities(
+            TorchSingleLayerDenseTanhModel(
+                vectorizer=ScikitTfidfVectorizer(max_features=100), max_epochs=5, preload_memmap_directory=directory
+            )
+        )
+
+
+def test_ann_torch_model_requires_positive_score_epochs_interval():
+    """Check that an invalid interval of scored epochs is rejected before training."""
+    for score_epochs_interval in [0, -1, 1.5]:
+        with pytest.raises(ValueError):
+            TorchSingleLayerDenseTanhModel(
+                vectorizer=ScikitTfidfVectorizer(max_features=100), score_epochs_interval=score_epochs_interval
+            )
+
+
 def test_bert_ann_torch_model():
     """Test fitting and predicting with a basic torch model."""
     check_model_predicts_non_zero_probabilities(